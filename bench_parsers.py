@@ -0,0 +1,108 @@
+import time
+import random
+import argparse
+
+from md_tasks import iter_tasks
+from md_mordkovich import iter_paragraph_tasks, read_answer_table
+
+# --------------------------
+# Бенчмарк парсеров на синтетических файлах
+# --------------------------
+# Пример: python3 bench_parsers.py --tasks 100000 --repeat 3
+
+
+def synth_bold_tasks(count: int, seed: int = 0) -> str:
+    """Файл формата «**N** [d]» из count заданий"""
+    rnd = random.Random(seed)
+    parts = [
+        "---",
+        "topic: Синтетическая тема",
+        "difficulty: 1",
+        "tags: Бенчмарк",
+        "---",
+        "",
+        "# Синтетический файл",
+        "### Задания",
+        "",
+    ]
+    for n in range(1, count + 1):
+        a, b = rnd.randint(2, 99), rnd.randint(2, 99)
+        parts.append(f"**{n}** [{rnd.randint(1, 3)}] Найдите значение выражения: ")
+        parts.append(f"$\\log_{{{a}}} {b} + \\frac{{{a}}}{{{b}}}$")
+        if n % 3 == 0:
+            parts.append(f"если $x = {a}$")
+        parts.append(f"ответ: {a + b}")
+        parts.append("tags: [База, Логарифм, Вычисления]")
+        parts.append("")
+    return "\n".join(parts)
+
+
+def synth_mordkovich_paragraph(count: int, seed: int = 0, paragraph: int = 16) -> str:
+    """Параграф задачника Мордковича из count номеров с подпунктами а)–г) и таблицей ответов"""
+    rnd = random.Random(seed)
+    parts = [
+        "---",
+        f"topic: §{paragraph}. Синтетический параграф",
+        f"paragraph: {paragraph}",
+        "difficulty: 1",
+        "tags: Бенчмарк",
+        "---",
+        "",
+        f"# §{paragraph}. Синтетический параграф",
+        "",
+        "### Задания",
+    ]
+    for n in range(1, count + 1):
+        parts.append(f"**{paragraph}.{n}.**  [{rnd.randint(1, 3)}] Вычислите:")
+        for letter in "абвг":
+            a, b = rnd.randint(2, 99), rnd.randint(2, 99)
+            parts.append(f"{letter}) $\\log_{{{a}}} {b} + \\log_{{{a}}} {a * b}$;  ")
+        parts.append("")
+    parts += ["## Ответы", "", "| № | а | б | в | г |", "|---|---|---|---|---|"]
+    for n in range(1, count + 1):
+        cells = [f"$\\frac{{{rnd.randint(1, 9)}}}{{{rnd.randint(2, 9)}}}$" for _ in range(4)]
+        parts.append(f"| **{paragraph}.{n}** | " + " | ".join(cells) + " |")
+    return "\n".join(parts)
+
+
+def bench(name: str, func, text: str, repeat: int):
+    best = None
+    count = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = func(text)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    size_mb = len(text.encode("utf-8")) / 1e6
+    print(f"{name:<36} {count:>8} записей  {best:8.3f} с  "
+          f"{count / best:>10.0f} зап/с  {size_mb / best:7.1f} МБ/с")
+
+
+def run_bold(text: str) -> int:
+    return sum(1 for _ in iter_tasks(text.split("\n")))
+
+
+def run_mordkovich(text: str) -> int:
+    return sum(len(task["subtasks"]) for task in iter_paragraph_tasks(text.split("\n")))
+
+
+def run_answers(text: str) -> int:
+    return len(read_answer_table(text.split("\n")))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Бенчмарк парсеров Markdown")
+    parser.add_argument("--tasks", type=int, default=100000, help="сколько заданий в синтетическом файле")
+    parser.add_argument("--repeat", type=int, default=3, help="сколько повторов (берётся лучший)")
+    args = parser.parse_args()
+
+    bold_text = synth_bold_tasks(args.tasks)
+    print(f"Синтетический файл «**N** [d]»: {args.tasks} заданий, "
+          f"{len(bold_text.encode('utf-8')) / 1e6:.1f} МБ")
+    bench("md_tasks.iter_tasks", run_bold, bold_text, args.repeat)
+
+    mordkovich_text = synth_mordkovich_paragraph(args.tasks)
+    print(f"\nСинтетический параграф Мордковича: {args.tasks} номеров, "
+          f"{len(mordkovich_text.encode('utf-8')) / 1e6:.1f} МБ")
+    bench("md_mordkovich.iter_paragraph_tasks", run_mordkovich, mordkovich_text, args.repeat)
+    bench("md_mordkovich.read_answer_table", run_answers, mordkovich_text, args.repeat)
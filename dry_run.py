@@ -0,0 +1,50 @@
+import sys
+import json
+import time
+from contextlib import contextmanager
+
+# --------------------------
+# Общие части режима --dry-run
+# --------------------------
+# В режиме проверки парсеры не обращаются к серверу: разбирают файл,
+# проверяют задания и выводят будущие записи в JSONL с замерами по фазам.
+
+
+class PhaseTimer:
+    """Замеры времени по фазам: with timer.phase("разбор"): ..."""
+
+    def __init__(self):
+        self.phases = []
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - start))
+
+    def report(self, out=None):
+        out = out or sys.stderr
+        total = sum(seconds for _, seconds in self.phases)
+        print("\n⏱️  Время по фазам:", file=out)
+        for name, seconds in self.phases:
+            print(f"   {name:<24} {seconds * 1000:10.1f} мс", file=out)
+        print(f"   {'всего':<24} {total * 1000:10.1f} мс", file=out)
+
+
+def write_jsonl(records, path: str = "-") -> int:
+    """Пишет записи в JSONL (путь '-' — стандартный вывод), возвращает их число"""
+    out = sys.stdout if path == "-" else open(path, "w", encoding="utf-8")
+    count = 0
+    try:
+        for record in records:
+            out.write(json.dumps(record, ensure_ascii=False))
+            out.write("\n")
+            count += 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        else:
+            out.flush()
+    return count
@@ -1,68 +1,228 @@
-import requests
+import os
+import time
+import sqlite3
 
-PB_URL = "http://127.0.0.1:8090"
-ADMIN_EMAIL = "oleg.faust@gmail.com"     # ← замени
-ADMIN_PASSWORD = "Zasadazxasqw12#"        # ← замени
+from pb_client import PocketBaseClient
 
+# Номера в кодах дополняются нулями до трёх знаков: '14-007'
+CODE_WIDTH = 3
+# Рядом со скриптом, а не в текущей папке: запуски из разных папок резервируют в одной базе
+RESERVATIONS_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".code_reservations.sqlite3")
+# Сколько секунд доверяем максимуму, прочитанному с сервера
+CACHE_TTL = 60
 
 
-def admin_login() -> str:
-    resp = requests.post(
-        f"{PB_URL}/api/collections/_superusers/auth-with-password",
-        json={
-            "identity": ADMIN_EMAIL,
-            "password": ADMIN_PASSWORD
-        }
-    )
-    resp.raise_for_status()
-    return resp.json()["token"]
+def parse_code_number(code: str, prefix: str):
+    """Возвращает номер из кода вида '{prefix}NNN' или None"""
+    if not code or not code.startswith(prefix):
+        return None
+    try:
+        return int(code[len(prefix):])
+    except ValueError:
+        return None
 
 
-def generate_code(topic_id: str) -> str:
-    token = admin_login()
-    headers = {"Authorization": f"Bearer {token}"}
+_prefix_cache = {}
 
-    # 1. Получаем тему
-    topic_resp = requests.get(
-        f"{PB_URL}/api/collections/topics/records/{topic_id}",
-        headers=headers
-    )
-    topic_resp.raise_for_status()
-    topic = topic_resp.json()
 
+def topic_code_prefix(client: PocketBaseClient, topic_id: str) -> str:
+    """Префикс кодов темы: '{ege_number}-' (например, '14-' или 'M14-')"""
+    cached = _prefix_cache.get(topic_id)
+    if cached and time.monotonic() - cached[1] < CACHE_TTL:
+        return cached[0]
+    topic = client.topics.get(topic_id, fields="ege_number")
     ege_number = topic.get("ege_number")
-    if ege_number is None:
+    if not ege_number:
         raise ValueError("У темы не указан ege_number")
+    _prefix_cache[topic_id] = (f"{ege_number}-", time.monotonic())
+    return f"{ege_number}-"
+
+
+def fetch_max_code_number(client: PocketBaseClient, topic_id: str, prefix: str) -> int:
+    """Максимальный номер среди кодов темы (все страницы, один проход)"""
+    max_num = 0
+    for task in client.tasks.by_topic(topic_id, fields="code"):
+        num = parse_code_number(task.get("code"), prefix)
+        if num is not None and num > max_num:
+            max_num = num
+    return max_num
 
-    # 2. Получаем задачи этой темы
-    tasks_resp = requests.get(
-        f"{PB_URL}/api/collections/tasks/records",
-        headers=headers,
-        params={
-            "filter": f'topic="{topic_id}"',
-            "fields": "code",
-            "perPage": 200
-        }
+
+def query_max_code_number(client: PocketBaseClient, topic_id: str, prefix: str) -> int:
+    """
+    Максимальный номер кодов темы запросами по одной записи с сортировкой на сервере.
+    Коды — строки, и '14-999' > '14-1000', поэтому сначала находится самая большая
+    ширина номера: по одному запросу-пробе с LIKE на каждую ширину больше CODE_WIDTH
+    (обычно один запрос, при номерах до 9999 — два) и ещё один запрос с сортировкой
+    за максимумом среди кодов этой ширины.
+    Если коды темы не по схеме — перечитываются все (fetch_max_code_number).
+    """
+    def at_least(width):
+        return f'code ~ "{prefix}{"_" * width}%"'
+
+    topic_filter = f'topic = "{topic_id}"'
+    width = CODE_WIDTH
+    while client.tasks.first(f"{topic_filter} && {at_least(width + 1)}", fields="code"):
+        width += 1
+
+    last = client.tasks.first(
+        f"{topic_filter} && {at_least(width)} && code !~ \"{prefix}{'_' * (width + 1)}%\"",
+        fields="code", sort="-code"
     )
-    tasks_resp.raise_for_status()
-    tasks = tasks_resp.json().get("items", [])
-
-    counters = []
-    for task in tasks:
-        code = task.get("code")
-        if not code:
-            continue
+    num = parse_code_number(last.get("code"), prefix) if last else None
+    if num is None:
+        return fetch_max_code_number(client, topic_id, prefix)
+    return num
+
+
+class CodeReservations:
+    """
+    Резервирование кодов между процессами.
+    Последний выданный номер каждой темы хранится в SQLite, а диапазон
+    резервируется в транзакции BEGIN IMMEDIATE — одновременные запуски
+    не получат один код. Максимум с сервера перечитывается не чаще раза
+    в ttl секунд, остальные резервы обходятся без сети.
+    """
+
+    def __init__(self, path: str = RESERVATIONS_DB, ttl: float = CACHE_TTL):
+        self.path = path
+        self.ttl = ttl
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS codes ("
+            "topic TEXT, prefix TEXT, last INTEGER NOT NULL, checked REAL NOT NULL, "
+            "PRIMARY KEY (topic, prefix))"
+        )
+        return conn
+
+    def reserve(self, topic_id: str, prefix: str, count: int, fetch_max) -> int:
+        """
+        Резервирует count номеров подряд, возвращает первый.
+        fetch_max() — максимум на сервере; вызывается, когда кэш устарел.
+        """
+        conn = self._connect()
         try:
-            _, num = code.split("-")
-            counters.append(int(num))
-        except ValueError:
-            continue
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT last, checked FROM codes WHERE topic = ? AND prefix = ?", (topic_id, prefix)
+                ).fetchone()
+                last, checked = row if row else (0, 0.0)
+                if row is None or time.time() - checked > self.ttl:
+                    last = max(last, fetch_max())
+                    checked = time.time()
+                conn.execute(
+                    "INSERT OR REPLACE INTO codes (topic, prefix, last, checked) VALUES (?, ?, ?, ?)",
+                    (topic_id, prefix, last + count, checked)
+                )
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+        return last + 1
+
+
+class CodeAllocator:
+    """
+    Выдаёт коды задач подряд. Подходит для схем '{ege_number}-NNN' и 'M{параграф}-NNN'.
+    С reservations номера резервируются в общем хранилище и не повторяются
+    между процессами; без него идут из памяти от last_number.
+    """
+
+    def __init__(self, prefix: str, last_number: int = 0, reservations: CodeReservations = None,
+                 client: PocketBaseClient = None, topic_id: str = None, mirror=None):
+        self.prefix = prefix
+        self.last_number = last_number
+        self.reservations = reservations
+        self.client = client
+        self.topic_id = topic_id
+        self.mirror = mirror
 
-    next_number = max(counters, default=0) + 1
-    return f"{ege_number}-{str(next_number).zfill(3)}"
+    @classmethod
+    def for_topic(cls, client: PocketBaseClient, topic_id: str, prefix: str = None,
+                  reservations: CodeReservations = None, mirror=None):
+        """mirror — локальное зеркало (pb_mirror): максимум кода берётся из него, а не с сервера"""
+        if prefix is None:
+            topic = mirror.topic(topic_id) if mirror is not None else None
+            if topic and topic["ege_number"]:
+                prefix = f"{topic['ege_number']}-"
+            else:
+                prefix = topic_code_prefix(client, topic_id)
+        return cls(prefix, reservations=reservations or CodeReservations(), client=client, topic_id=topic_id,
+                   mirror=mirror)
+
+    def format(self, number: int) -> str:
+        return f"{self.prefix}{str(number).zfill(CODE_WIDTH)}"
+
+    def next(self) -> str:
+        return self.take(1)[0]
+
+    def max_code_number(self) -> int:
+        if self.mirror is not None:
+            return self.mirror.max_code_number(self.topic_id, self.prefix)
+        return query_max_code_number(self.client, self.topic_id, self.prefix)
+
+    def take(self, count: int) -> list:
+        """Резервирует непрерывный диапазон из count кодов"""
+        if self.reservations is not None:
+            start = self.reservations.reserve(self.topic_id, self.prefix, count, self.max_code_number)
+            self.last_number = start + count - 1
+        else:
+            start = self.last_number + 1
+            self.last_number += count
+        return [self.format(n) for n in range(start, self.last_number + 1)]
+
+    def assign(self, records: list) -> list:
+        """
+        Проставляет коды записям одним непрерывным диапазоном: один резерв
+        на файл, а не транзакция на каждую задачу.
+        """
+        if records:
+            for record, code in zip(records, self.take(len(records))):
+                record["code"] = code
+        return records
+
+
+_client = None
+
+
+def default_client() -> PocketBaseClient:
+    """Клиент с авторизацией — один на процесс"""
+    global _client
+    if _client is None:
+        _client = PocketBaseClient()
+        _client.login()
+    return _client
+
+
+def reserve_codes(topic_id: str, count: int = 1, client: PocketBaseClient = None, prefix: str = None,
+                  mirror=None) -> list:
+    return CodeAllocator.for_topic(client or default_client(), topic_id, prefix, mirror=mirror).take(count)
+
+
+def generate_code(topic_id: str, client: PocketBaseClient = None, mirror=None) -> str:
+    return reserve_codes(topic_id, 1, client, mirror=mirror)[0]
 
 
 if __name__ == "__main__":
-    topic_id = input("Введите topic_id: ").strip()
-    code = generate_code(topic_id)
+    import argparse
+
+    arg_parser = argparse.ArgumentParser(description="Выдача нового кода задачи для темы")
+    arg_parser.add_argument("topic_id", nargs="?", help="ID темы (без него будет запрошен)")
+    arg_parser.add_argument("--mirror", action="store_true",
+                            help="брать максимальный код из локального зеркала (pb_mirror.py), досинхронизировав его")
+    args = arg_parser.parse_args()
+
+    topic_id = args.topic_id or input("Введите topic_id: ").strip()
+    mirror = None
+    if args.mirror:
+        from pb_mirror import open_synced
+        mirror = open_synced(default_client())
+    code = generate_code(topic_id, mirror=mirror)
     print(f"Новый код задачи: {code}")
@@ -0,0 +1,262 @@
+import re
+
+# --------------------------
+# Сканер параграфов задачника Мордковича
+# --------------------------
+# Один проход по строкам секции '## Задания', без поиска с просмотром вперёд
+# по всему тексту. Пример задания:
+#
+#   **16.1.**  [1] Вычислите:
+#   a) $\log_6 2 + \log_6 3$;
+#   б) $\log_{26} 2 + \log_{26} 13$;
+
+TASKS_HEADING = re.compile(r"## Задания\s*$")
+ANSWERS_HEADING = "## Ответы"
+TASK_HEADER = re.compile(r"(?:\*\*)?(\d+\.\d+)\.(?:\*\*)?\s*\[(\d+)\]\s*(.*)$")
+# Любой номер в начале строки («14.2.» даже без сложности) закрывает задание
+TASK_NUMBER = re.compile(r"(?:\*\*)?\d+\.\d+\.")
+# Первые символы строк, которые могут закрыть задание — остальные строки
+# не проверяются регулярными выражениями вовсе
+BOUNDARY_CHARS = frozenset("#*0123456789")
+SUBTASK_LETTERS = frozenset("абвгabcd")
+
+LETTER_MAP = {'а': 'a', 'б': 'b', 'в': 'c', 'г': 'd'}
+
+
+def _finish(task, body, subtasks):
+    """Склеивает инструкцию (текст до первого подпункта) с условиями подпунктов"""
+    instruction = "\n".join(body).strip() if subtasks is not None else ""
+    task["instruction"] = instruction
+    task["subtasks"] = {
+        letter: f"{instruction} {statement}".strip()
+        for letter, statement in (subtasks or {}).items()
+    }
+    return task
+
+
+def iter_paragraph_tasks(lines):
+    """
+    Разбирает строки файла параграфа и по одному отдаёт задания:
+    {"number", "difficulty", "instruction", "subtasks": {буква: условие}}.
+    Условие подпункта уже склеено с инструкцией; буквы приведены к латинице.
+    Строки можно передавать любым итерируемым (в том числе открытым файлом).
+    Если секции '## Задания' нет, в конце бросается ValueError.
+    """
+    if isinstance(lines, str):
+        lines = lines.split("\n")
+
+    in_section = False
+    found_section = False
+    task = None
+    body = []           # строки инструкции — до первого подпункта
+    subtasks = None     # None — подпунктов ещё не было
+    pending = None      # буква подпункта, условие которого на следующей строке
+
+    for raw in lines:
+        raw = raw.rstrip("\n")
+
+        if not in_section:
+            if TASKS_HEADING.search(raw):
+                in_section = found_section = True
+            continue
+
+        # Конец задания: заголовок, новый номер или конец секции
+        if raw[:1] in BOUNDARY_CHARS and (raw.startswith("##") or TASK_NUMBER.match(raw)):
+            if task is not None:
+                yield _finish(task, body, subtasks)
+                task = None
+            if raw.startswith(ANSWERS_HEADING):
+                break
+
+            match = TASK_HEADER.match(raw)
+            if not match:
+                continue
+            task = {"number": match.group(1), "difficulty": match.group(2)}
+            body = []
+            subtasks = None
+            pending = None
+            # Остаток строки с номером — начало инструкции или сразу подпункт
+            raw = match.group(3)
+
+        if task is None:
+            continue
+
+        # Условие подпункта «а)» перенесено на следующую строку
+        if pending is not None:
+            if raw.strip():
+                subtasks[pending] = raw.strip()
+                pending = None
+            continue
+
+        # Подпункт: «а) условие» (буква кириллицей или латиницей)
+        stripped = raw.lstrip()
+        if stripped[1:2] == ")" and stripped[:1] in SUBTASK_LETTERS:
+            if subtasks is None:
+                subtasks = {}
+            letter = LETTER_MAP.get(stripped[0], stripped[0])
+            statement = stripped[2:].strip()
+            if statement:
+                subtasks[letter] = statement
+            else:
+                pending = letter
+        elif subtasks is None:
+            body.append(raw)
+
+    if task is not None:
+        yield _finish(task, body, subtasks)
+    if not found_section:
+        raise ValueError("Не найдена секция '## Задания'")
+
+
+# --------------------------
+# Таблица ответов
+# --------------------------
+# Поддерживаются оба вида таблиц задачника:
+#
+#   | № | а | б | в | г |                 — ответ каждого подпункта в своей колонке
+#   | **16.1** | 1 | 1 | 2 | 2 |
+#
+#   |**Номер**|**Ответы**|                 — все подпункты в одной ячейке
+#   |**14.5**|**а)** 4; **б)** 5; **в)** $$-2\frac{1}{3}$$|
+#
+# Строка таблицы может быть перенесена на несколько строк файла, а строка
+# с пустой ячейкой номера продолжает ответы предыдущего задания.
+
+ANSWERS_SECTION = re.compile(r"#+\s*Ответы\s*$")
+ANSWER_TASK_NUMBER = re.compile(r"(?:\*\*)?(\d+\.\d+)\.?(?:\*\*)?$")
+ANSWER_MARKER = re.compile(r"\*\*([а-гa-d])\)\*\*")
+COLUMN_LETTER = re.compile(r"(?:\*\*)?([а-гa-d])\)?(?:\*\*)?$")
+NO_ANSWER = {"", "—", "–", "-"}
+DEFAULT_COLUMNS = ("a", "b", "c", "d")
+
+
+def split_row(row: str):
+    """Ячейки строки таблицы; '|' внутри формул $...$ и '\\|' ячейки не делят"""
+    pieces = row.strip().strip("|").split("|")
+    # Обычный случай: ни одна формула не содержит '|' — хватает split
+    if "\\|" not in row and "\\$" not in row and ("$" not in row or not any(piece.count("$") % 2 for piece in pieces)):
+        return [piece.strip() for piece in pieces]
+    cells = []
+    current = []
+    dollars = 0
+    for piece in pieces:
+        current.append(piece)
+        dollars += piece.count("$") - piece.count("\\$")
+        if piece.endswith("\\") or dollars % 2:
+            continue
+        cells.append("|".join(current).strip())
+        current = []
+        dollars = 0
+    if current:
+        cells.append("|".join(current).strip())
+    return cells
+
+
+class AnswerIndex:
+    """Ответы таблицы: (номер задания, буква подпункта) -> ответ"""
+
+    def __init__(self):
+        self.answers = {}
+        self.duplicates = []
+
+    def __len__(self):
+        return len(self.answers)
+
+    def __contains__(self, key):
+        return key in self.answers
+
+    def add(self, task_num: str, letter: str, answer: str):
+        key = (task_num, LETTER_MAP.get(letter, letter))
+        if key in self.answers:
+            self.duplicates.append(key)
+        self.answers[key] = answer
+
+    def get(self, task_num: str, letter: str, default: str = ""):
+        return self.answers.get((task_num, letter), default)
+
+    def check(self, tasks):
+        """
+        Сверка с заданиями {номер: {буква: условие}}:
+        (подпункты без ответа, ответы без подпункта) — списки пар (номер, буква).
+        """
+        missing = [(task_num, letter)
+                   for task_num, subtasks in tasks.items()
+                   for letter in subtasks
+                   if (task_num, letter) not in self.answers]
+        orphans = [key for key in self.answers
+                   if key[1] not in tasks.get(key[0], ())]
+        return missing, orphans
+
+    def _add_row(self, task_num: str, cells, columns):
+        # Все подпункты в одной ячейке: [текст до меток, буква, ответ, буква, ответ, ...]
+        parts = ANSWER_MARKER.split("|".join(cells))
+        if len(parts) > 1:
+            for letter, answer in zip(parts[1::2], parts[2::2]):
+                answer = answer.strip().rstrip(";|").strip()
+                if answer not in NO_ANSWER:
+                    self.add(task_num, letter, answer)
+            return
+        # Ответ каждого подпункта в своей колонке
+        for letter, cell in zip(columns, cells):
+            if cell not in NO_ANSWER:
+                self.add(task_num, letter, cell)
+
+
+def read_answer_table(lines) -> AnswerIndex:
+    """
+    Читает таблицу ответов из секции '## Ответы' за один проход по строкам
+    и сразу строит индекс (номер, буква) -> ответ.
+    """
+    if isinstance(lines, str):
+        lines = lines.split("\n")
+
+    index = AnswerIndex()
+    in_section = False
+    columns = DEFAULT_COLUMNS
+    task_num = None
+    pending = []    # строка таблицы, перенесённая на несколько строк файла
+
+    for raw in lines:
+        if not in_section:
+            in_section = "Ответы" in raw and bool(ANSWERS_SECTION.match(raw.strip()))
+            continue
+
+        line = raw.strip()
+
+        if pending:
+            pending.append(line)
+            if not line.endswith("|"):
+                continue
+            line = " ".join(pending)
+            pending = []
+        elif line.startswith("|"):
+            if len(line) == 1 or not line.endswith("|"):
+                pending = [line]
+                continue
+        else:
+            # Таблица закончилась; следующая может начаться ниже
+            if line.startswith("#"):
+                break
+            continue
+
+        if not line.strip("|-: "):
+            continue    # разделитель |---|---| или пустая строка таблицы
+        cells = split_row(line)
+
+        number = ANSWER_TASK_NUMBER.match(cells[0])
+        if number:
+            task_num = number.group(1)
+        elif cells[0]:
+            # Шапка: буквы колонок (| № | а | б | в | г |) или общая ячейка ответов
+            letters = [COLUMN_LETTER.match(c) for c in cells[1:]]
+            if letters and all(letters):
+                columns = tuple(LETTER_MAP.get(m.group(1), m.group(1)) for m in letters)
+            else:
+                columns = DEFAULT_COLUMNS
+            task_num = None
+            continue
+        if task_num is None:
+            continue
+        index._add_row(task_num, cells[1:], columns)
+
+    return index
@@ -0,0 +1,80 @@
+import re
+from collections import OrderedDict
+
+from md_mordkovich import split_row
+
+# --------------------------
+# Формат «нумерованный список + таблица ответов»
+# --------------------------
+# Так устроены файлы source/4.md, 14.md, 16.md и др.:
+#
+#   ### Задания
+#   1. Найдите значение выражения $$\log_{2}112 - \log_{2}7$$.
+#   2. ...
+#
+#   ### Ответы
+#   | № | Ответ |
+#   |---|-------|
+#   | 1 | 4     |
+#
+# Задания и ответы читаются за один проход по строкам.
+
+TASKS_SECTION = re.compile(r"#+\s*Задания\s*$")
+ANSWERS_SECTION = re.compile(r"#+\s*Ответы\s*$")
+TASK_ITEM = re.compile(r"(\d+)\.\s+(.*)$")
+ANSWER_NUMBER = re.compile(r"(?:\*\*)?(\d+)\.?(?:\*\*)?$")
+
+
+def read_numbered(lines):
+    """
+    Задания и ответы файла: ({номер: условие}, {номер: ответ}).
+    Строки после «N.» до следующего номера или заголовка продолжают условие.
+    """
+    if isinstance(lines, str):
+        lines = lines.split("\n")
+
+    tasks = OrderedDict()
+    answers = OrderedDict()
+    section = None      # None, "tasks" или "answers"
+    number = None
+    statement = []
+
+    def finish():
+        if number is not None:
+            tasks[number] = "\n".join(statement).strip()
+
+    for raw in lines:
+        line = raw.strip()
+        if not line:
+            continue
+
+        if line.startswith("#"):
+            if section == "tasks":
+                finish()
+                number = None
+            if TASKS_SECTION.match(line):
+                section = "tasks"
+            elif ANSWERS_SECTION.match(line):
+                section = "answers"
+            else:
+                section = None
+            continue
+
+        if section == "tasks":
+            match = TASK_ITEM.match(line)
+            if match:
+                finish()
+                number = int(match.group(1))
+                statement = [match.group(2)]
+            elif number is not None:
+                statement.append(line)
+
+        elif section == "answers" and line.startswith("|"):
+            cells = split_row(line)
+            match = ANSWER_NUMBER.match(cells[0])
+            if match and len(cells) > 1 and cells[1]:
+                answers[int(match.group(1))] = cells[1]
+
+    if section == "tasks":
+        finish()
+    return tasks, answers
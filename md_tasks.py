@@ -0,0 +1,135 @@
+import re
+import yaml
+
+# --------------------------
+# Токенизатор формата «**N** [сложность] условие»
+# --------------------------
+# Один проход по строкам с заранее скомпилированными шаблонами.
+# Пример задания:
+#
+#   **1** [1] Найдите значение выражения:
+#   $7 \cdot 5^{\log_5 4}$
+#   ответ: 28
+#   tags: [База, Логарифм]
+
+FRONT_MATTER = re.compile(r"^---\s*\n(.*?)\n---", re.DOTALL | re.MULTILINE)
+TASK_HEADER = re.compile(r"\*\*(\d+)\*\*\s+\[(\d+)\]\s+(.*)$")
+ANSWER_PREFIX = "ответ:"
+TAGS_PREFIX = "tags:"
+
+
+def parse_tags(tags_input):
+    """
+    Парсит теги из строки или списка.
+    Поддерживает форматы:
+    - "Логарифм" -> ["Логарифм"]
+    - "[База, Логарифм, Вычисления]" -> ["База", "Логарифм", "Вычисления"]
+    - "База, Логарифм" -> ["База", "Логарифм"]
+    """
+    if not tags_input:
+        return []
+
+    # Если это список
+    if isinstance(tags_input, list):
+        return [str(t).strip() for t in tags_input if str(t).strip()]
+
+    # Если это строка
+    if isinstance(tags_input, str):
+        tags_input = tags_input.strip()
+
+        # Убираем квадратные скобки если есть
+        if tags_input.startswith('[') and tags_input.endswith(']'):
+            tags_input = tags_input[1:-1]
+
+        # Разделяем по запятой
+        return [t.strip() for t in tags_input.split(",") if t.strip()]
+
+    return []
+
+
+def read_front_matter(md_text: str):
+    """YAML-блок в начале файла как словарь или None, если блока нет"""
+    yaml_block = FRONT_MATTER.search(md_text)
+    if not yaml_block:
+        return None
+    return yaml.safe_load(yaml_block.group(1)) or {}
+
+
+def iter_tasks(lines):
+    """
+    Разбирает строки файла и по одному отдаёт задания:
+    {"number", "difficulty", "statement_md", "answer", "tag_titles"}.
+    tag_titles равен None, если у задания нет строки tags:.
+    YAML-блок и заголовки (#...) пропускаются.
+    """
+    if isinstance(lines, str):
+        lines = lines.split("\n")
+
+    task = None
+    statement = []
+    in_statement = False
+    front_matter = None   # None — ещё не было непустых строк
+
+    for raw in lines:
+        # YAML-блок в начале файла
+        if front_matter is not False:
+            if front_matter is None:
+                if not raw.strip():
+                    continue
+                if raw.rstrip() == "---":
+                    front_matter = True
+                    continue
+                front_matter = False
+            elif raw.rstrip() == "---":
+                front_matter = False
+                continue
+            else:
+                continue
+
+        # Заголовки Markdown
+        if raw.startswith("#"):
+            continue
+
+        line = raw.strip()
+        if not line:
+            continue
+
+        # Начало нового задания: **номер** [сложность]
+        if line.startswith("**"):
+            match = TASK_HEADER.match(line)
+            if match:
+                if task is not None:
+                    task["statement_md"] = "\n".join(statement).strip()
+                    yield task
+                first_line = match.group(3).strip()
+                task = {
+                    "number": int(match.group(1)),
+                    "difficulty": match.group(2),
+                    "statement_md": "",
+                    "answer": "",
+                    "tag_titles": None,
+                }
+                statement = [first_line] if first_line else []
+                in_statement = True
+                continue
+
+        # Строка с ответом
+        if line.startswith(ANSWER_PREFIX):
+            if task is not None:
+                task["answer"] = line[len(ANSWER_PREFIX):].strip()
+                in_statement = False
+            continue
+
+        # Строка с тегами задачи
+        if line.startswith(TAGS_PREFIX):
+            if task is not None:
+                task["tag_titles"] = parse_tags(line[len(TAGS_PREFIX):].strip())
+            continue
+
+        # Собираем строки условия
+        if in_statement:
+            statement.append(line)
+
+    if task is not None:
+        task["statement_md"] = "\n".join(statement).strip()
+        yield task
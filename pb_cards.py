@@ -0,0 +1,113 @@
+import os
+
+from pb_client import PocketBaseClient, DEFAULT_POOL_SIZE
+from pb_upload import BatchUploader, DEFAULT_BATCH_SIZE, DEFAULT_CONCURRENCY
+from pb_dedup import StatementIdIndex
+from md_tasks import read_front_matter
+
+# --------------------------
+# Выгрузка карточек в коллекцию cards
+# --------------------------
+# Карточки test_generator.py сохраняются так же, как их сохраняет веб-приложение:
+# связь tasks, формат, раскладка и флаги показа ответов. ID задачи для условия
+# берётся из индекса, который строится одним постраничным проходом по задачам
+# каждой темы, а сами карточки создаются пакетными запросами /api/batch.
+
+SOURCE_DIR = "source"
+# Значения формата — как в WorksheetGenerator.jsx (кириллица)
+CARD_FORMATS = ("А6", "А5", "А4")
+DEFAULT_CARD_FORMAT = "А6"
+DEFAULT_LAYOUT = "one-column"
+DEFAULT_TITLE = "Карточка"
+
+
+def normalize_card_format(value: str) -> str:
+    """'a5', 'A5' и 'А5' -> 'А5'"""
+    fmt = value.strip().upper().replace("A", "А")
+    if fmt not in CARD_FORMATS:
+        raise ValueError(f"Неизвестный формат '{value}', ожидается один из: {', '.join(CARD_FORMATS)}")
+    return fmt
+
+
+def source_topic(md_file: str):
+    with open(md_file, "r", encoding="utf-8") as f:
+        metadata = read_front_matter(f.read())
+    return (metadata or {}).get("topic")
+
+
+def resolve_pool(client, pool, source_dir: str = SOURCE_DIR, mirror=None):
+    """
+    ID задачи в PocketBase для каждого задания пула (None — задачи нет в базе).
+    Условия сравниваются по хешу нормализованного текста.
+    С зеркалом (pb_mirror) темы и задачи ищутся локально.
+    """
+    task_ids = [None] * len(pool.exprs)
+    for file_num, (start, size) in pool.ranges.items():
+        title = source_topic(os.path.join(source_dir, f"{file_num}.md"))
+        if not title:
+            topic = None
+        elif mirror is not None:
+            topic = mirror.topic_by_title(title)
+        else:
+            topic = client.topics.by_title(title)
+        if topic is None:
+            print(f"   ⚠️ {file_num}.md: тема '{title}' не найдена в PocketBase")
+            continue
+        index = StatementIdIndex.load(client, topic["id"], mirror=mirror)
+        for i in range(start, start + size):
+            task_ids[i] = index.get(pool.exprs[i])
+    return task_ids
+
+
+def card_record(card_id: str, task_ids: list, title: str = DEFAULT_TITLE, card_format: str = DEFAULT_CARD_FORMAT,
+                show_answers: bool = False, note: str = "") -> dict:
+    """Поля коллекции cards — те же, что отправляет WorksheetGenerator.jsx"""
+    return {
+        "title": f"{title} {card_id}",
+        "tasks": task_ids,
+        "format": card_format,
+        "layout": DEFAULT_LAYOUT,
+        "show_answers": show_answers,
+        "show_solutions": False,
+        "note": note,
+    }
+
+
+def export_cards(client, batch, title: str = DEFAULT_TITLE, card_format: str = DEFAULT_CARD_FORMAT,
+                 show_answers: bool = False, note: str = "",
+                 batch_size: int = DEFAULT_BATCH_SIZE, concurrency: int = DEFAULT_CONCURRENCY, mirror=None):
+    """
+    Создаёт записи cards для партии карточек test_generator.CardBatch.
+    Возвращает (создано, с ошибкой, [номера карточек с заданиями не из базы]).
+    """
+    task_ids = resolve_pool(client, batch.pool, mirror=mirror)
+    missing = sum(1 for task_id in task_ids if task_id is None)
+    if missing:
+        print(f"   ⚠️ {missing} из {len(task_ids)} заданий не найдены в PocketBase — "
+              f"карточки с ними не сохраняются (загрузите задачи через pb_ingest.py)")
+
+    skipped = []
+
+    def records():
+        for card_id, row in batch.rows():
+            ids = [task_ids[i] for i in row]
+            if None in ids:
+                skipped.append(card_id)
+                continue
+            yield card_id, card_record(card_id, ids, title, card_format, show_answers, note)
+
+    uploader = BatchUploader(client, "cards", batch_size=batch_size, concurrency=concurrency)
+    created = failed = 0
+    for card_id, _, ok, detail in uploader.upload(records()):
+        if ok:
+            created += 1
+        else:
+            failed += 1
+            print(f"❌ {card_id}: {detail}")
+    return created, failed, skipped
+
+
+def connect(concurrency: int = DEFAULT_CONCURRENCY):
+    client = PocketBaseClient(pool_size=max(DEFAULT_POOL_SIZE, concurrency))
+    client.login()
+    return client
@@ -0,0 +1,250 @@
+import os
+import json
+import time
+import base64
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# --------------------------
+# Общий клиент PocketBase
+# --------------------------
+# Одна сессия requests с пулом keep-alive соединений: TCP-соединение
+# открывается один раз и переиспользуется всеми запросами скрипта.
+
+PB_URL = "http://127.0.0.1:8090"
+ADMIN_EMAIL = "oleg.faust@gmail.com"
+ADMIN_PASSWORD = "Zasadazxasqw12#"
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_TIMEOUT = (5, 60)   # (подключение, чтение) в секундах
+PER_PAGE = 500
+
+SUPERUSERS_PATH = "/api/collections/_superusers"
+# Токен суперпользователя между запусками хранится на диске (только для владельца)
+TOKEN_CACHE = os.path.join(os.path.expanduser("~"), ".cache", "ege-tasks", "pb_token.json")
+# Если до истечения токена осталось меньше — продлеваем через auth-refresh
+TOKEN_REFRESH_MARGIN = 300
+
+
+def token_expiry(token: str) -> float:
+    """Время истечения JWT (поле exp) в секундах Unix; 0 — если разобрать не удалось"""
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return float(json.loads(base64.urlsafe_b64decode(payload)).get("exp", 0))
+    except (IndexError, ValueError, TypeError, AttributeError):
+        return 0.0
+
+
+class TokenCache:
+    """
+    Токены на диске: {"<url> <email>": token}. Файл создаётся с правами 0600
+    и подменяется целиком, поэтому параллельные скрипты читают его безопасно.
+    """
+
+    def __init__(self, path: str = TOKEN_CACHE):
+        self.path = path
+
+    def _read(self) -> dict:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def get(self, key: str):
+        token = self._read().get(key)
+        if token and token_expiry(token) > time.time():
+            return token
+        return None
+
+    def put(self, key: str, token: str):
+        data = self._read()
+        # Просроченные токены других серверов не копим
+        data = {k: v for k, v in data.items() if token_expiry(v) > time.time()}
+        data[key] = token
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", mode=0o700, exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass    # кэш — только ускорение; без права записи входим паролем каждый раз
+
+
+class Collection:
+    """Записи одной коллекции: /api/collections/{name}/records"""
+
+    def __init__(self, client: "PocketBaseClient", name: str):
+        self.client = client
+        self.name = name
+        self.path = f"/api/collections/{name}/records"
+
+    def get(self, record_id: str, fields: str = None) -> dict:
+        params = {"fields": fields} if fields else None
+        resp = self.client.request("GET", f"{self.path}/{record_id}", params=params)
+        resp.raise_for_status()
+        return resp.json()
+
+    def list(self, filter: str = None, fields: str = None, sort: str = None,
+             per_page: int = PER_PAGE, page: int = 1) -> list:
+        """Одна страница записей"""
+        params = {"perPage": per_page, "page": page, "skipTotal": 1}
+        if filter:
+            params["filter"] = filter
+        if fields:
+            params["fields"] = fields
+        if sort:
+            params["sort"] = sort
+        resp = self.client.request("GET", self.path, params=params)
+        resp.raise_for_status()
+        return resp.json().get("items", [])
+
+    def first(self, filter: str, fields: str = None, sort: str = None):
+        items = self.list(filter=filter, fields=fields, sort=sort, per_page=1)
+        return items[0] if items else None
+
+    def iter_all(self, filter: str = None, fields: str = None, sort: str = None,
+                 per_page: int = PER_PAGE):
+        """Все записи постранично, без загрузки всей коллекции в память"""
+        page = 1
+        while True:
+            items = self.list(filter=filter, fields=fields, sort=sort, per_page=per_page, page=page)
+            yield from items
+            if len(items) < per_page:
+                return
+            page += 1
+
+    def create(self, data: dict) -> requests.Response:
+        """POST записи; ответ возвращается как есть, чтобы скрипт сам разобрал статус"""
+        return self.client.request("POST", self.path, json=data)
+
+    def update(self, record_id: str, data: dict) -> requests.Response:
+        return self.client.request("PATCH", f"{self.path}/{record_id}", json=data)
+
+
+class TasksCollection(Collection):
+
+    def by_topic(self, topic_id: str, fields: str = None):
+        return self.iter_all(filter=f'topic = "{topic_id}"', fields=fields)
+
+
+class TopicsCollection(Collection):
+
+    def by_title(self, title: str):
+        return self.first(f'title = "{title}"')
+
+    def by_ege_number(self, ege_number: str):
+        return self.first(f'ege_number = "{ege_number}"')
+
+
+class TagsCollection(Collection):
+
+    def by_title(self, title: str):
+        return self.first(f'title = "{title}"')
+
+
+class PocketBaseClient:
+    """
+    Клиент PocketBase с постоянной сессией.
+    pool_size — сколько соединений держать открытыми,
+    timeout — (подключение, чтение) для каждого запроса.
+    """
+
+    def __init__(self, url: str = PB_URL, pool_size: int = DEFAULT_POOL_SIZE,
+                 timeout=DEFAULT_TIMEOUT, token_cache: TokenCache = None):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        self.token_cache = token_cache if token_cache is not None else TokenCache()
+        self._credentials = None
+        self._cached_token = False
+        # Токен передаётся в заголовке каждого запроса, а не в session.headers:
+        # при --concurrency потоки делят сессию, и повторный вход не должен
+        # подменять заголовок запросам, которые уже в пути
+        self.token = None
+        self._auth_lock = threading.Lock()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.tasks = TasksCollection(self, "tasks")
+        self.topics = TopicsCollection(self, "topics")
+        self.tags = TagsCollection(self, "tags")
+
+    def collection(self, name: str) -> Collection:
+        return Collection(self, name)
+
+    def _send(self, method: str, path: str, token: str, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        if token:
+            kwargs["headers"] = {**(kwargs.get("headers") or {}), "Authorization": f"Bearer {token}"}
+        return self.session.request(method, f"{self.url}{path}", **kwargs)
+
+    def request(self, method: str, path: str, **kwargs) -> requests.Response:
+        token, cached = self.token, self._cached_token
+        resp = self._send(method, path, token, **kwargs)
+        if resp.status_code == 401 and token and cached:
+            # Токен из кэша отозван на сервере — входим паролем и повторяем запрос.
+            # Под блокировкой и только если токен ещё тот, что не прошёл:
+            # остальные потоки с тем же 401 возьмут уже полученный новый токен
+            with self._auth_lock:
+                if self.token == token:
+                    self._password_login(*self._credentials)
+            resp = self._send(method, path, self.token, **kwargs)
+        return resp
+
+    def login(self, email: str = ADMIN_EMAIL, password: str = ADMIN_PASSWORD, use_cache: bool = True) -> str:
+        """
+        Авторизация суперпользователя. Токен берётся из кэша на диске, пока
+        он действует; за TOKEN_REFRESH_MARGIN секунд до истечения продлевается
+        через auth-refresh, и только без токена выполняется вход по паролю.
+        """
+        self._credentials = (email, password)
+        self._cached_token = False
+        key = f"{self.url} {email}"
+
+        token = self.token_cache.get(key) if use_cache else None
+        if token and token_expiry(token) - time.time() < TOKEN_REFRESH_MARGIN:
+            token = self._refresh(token)
+            if token:
+                self.token_cache.put(key, token)
+        if token:
+            self._cached_token = True
+            self.token = token
+            return token
+        return self._password_login(email, password)
+
+    def _password_login(self, email: str, password: str) -> str:
+        resp = self._send(
+            "POST", f"{SUPERUSERS_PATH}/auth-with-password", None,
+            json={"identity": email, "password": password}
+        )
+        resp.raise_for_status()
+        token = resp.json()["token"]
+        self.token = token
+        self._cached_token = False
+        self.token_cache.put(f"{self.url} {email}", token)
+        return token
+
+    def _refresh(self, token: str):
+        """Новый токен через auth-refresh или None, если продлить не удалось"""
+        try:
+            resp = self.session.post(
+                f"{self.url}{SUPERUSERS_PATH}/auth-refresh",
+                headers={"Authorization": f"Bearer {token}"}, timeout=self.timeout
+            )
+        except requests.RequestException:
+            return None
+        if resp.status_code != 200:
+            return None
+        return resp.json().get("token")
+
+    def batch(self, requests_list: list) -> requests.Response:
+        """POST /api/batch со списком {"method", "url", "body"}"""
+        return self.request("POST", "/api/batch", json={"requests": requests_list})
@@ -0,0 +1,90 @@
+import re
+import hashlib
+
+# --------------------------
+# Индекс дубликатов по хешу условия
+# --------------------------
+# Условия сравниваются после нормализации: разделители формул $$, \( \), \[ \]
+# приводятся к $, пробелы внутри формул убираются, в тексте — схлопываются.
+# В индексе хранится только 16-байтовый хеш, поэтому память не зависит
+# от длины условий, а проверка — одна операция над множеством.
+
+HASH_SIZE = 16
+
+MATH_DELIMITERS = re.compile(r"\$\$|\\\(|\\\)|\\\[|\\\]")
+# Пробел после команды перед буквой значим: \sin x ≠ \sinx
+COMMAND_SPACE = re.compile(r"(\\[A-Za-z]+)\s+(?=[A-Za-z])")
+WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_statement(text: str) -> str:
+    """Каноническая форма условия для поиска дубликатов"""
+    text = MATH_DELIMITERS.sub("$", (text or "").strip())
+    parts = text.split("$")
+    for i, part in enumerate(parts):
+        if i % 2:
+            # Внутри формулы пробелы ни на что не влияют, кроме как после команд
+            part = COMMAND_SPACE.sub("\\1\x00", part)
+            parts[i] = WHITESPACE.sub("", part).replace("\x00", " ")
+        else:
+            parts[i] = WHITESPACE.sub(" ", part)
+    return "$".join(parts).strip()
+
+
+def statement_hash(text: str) -> bytes:
+    return hashlib.blake2b(normalize_statement(text).encode("utf-8"), digest_size=HASH_SIZE).digest()
+
+
+class StatementIndex:
+    """Множество хешей нормализованных условий"""
+
+    def __init__(self):
+        self.hashes = set()
+
+    @classmethod
+    def load(cls, client, topic_id: str, mirror=None):
+        """Постранично читает все условия темы, не держа их в памяти; с зеркалом — только хеши"""
+        index = cls()
+        if mirror is not None:
+            index.hashes.update(digest for digest, _ in mirror.statements(topic_id))
+            return index
+        for task in client.tasks.by_topic(topic_id, fields="statement_md"):
+            index.add(task.get("statement_md", ""))
+        return index
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def __contains__(self, statement: str):
+        return statement_hash(statement) in self.hashes
+
+    def add(self, statement: str):
+        self.hashes.add(statement_hash(statement))
+
+
+class StatementIdIndex:
+    """Хеш нормализованного условия -> ID задачи в PocketBase"""
+
+    def __init__(self):
+        self.ids = {}
+
+    @classmethod
+    def load(cls, client, topic_id: str, mirror=None):
+        """Все задачи темы за один постраничный проход (или из зеркала pb_mirror)"""
+        index = cls()
+        if mirror is not None:
+            for digest, task_id in mirror.statements(topic_id):
+                index.ids.setdefault(digest, task_id)
+            return index
+        for task in client.tasks.by_topic(topic_id, fields="id,statement_md"):
+            index.add(task.get("statement_md", ""), task["id"])
+        return index
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, statement: str, task_id: str):
+        self.ids.setdefault(statement_hash(statement), task_id)
+
+    def get(self, statement: str):
+        return self.ids.get(statement_hash(statement))
@@ -0,0 +1,676 @@
+import os
+import re
+import sys
+import glob
+import argparse
+from itertools import repeat
+from collections import OrderedDict
+from contextlib import redirect_stdout
+from concurrent.futures import ProcessPoolExecutor
+
+import pb_parser
+import pb_parser_mordkovich
+from generate_task_code import CodeAllocator
+from pb_client import PocketBaseClient, DEFAULT_POOL_SIZE
+from pb_upload import BatchUploader, DEFAULT_BATCH_SIZE, DEFAULT_CONCURRENCY
+from pb_tags import TagIndex
+from pb_dedup import StatementIndex
+from pb_manifest import IngestManifest, MANIFEST_FILE, content_hash
+from md_tasks import FRONT_MATTER, TASK_HEADER as BOLD_TASK_HEADER, parse_tags, read_front_matter
+from md_mordkovich import TASK_HEADER as MORDKOVICH_TASK_HEADER
+from md_numbered import TASK_ITEM as NUMBERED_TASK_ITEM, read_numbered
+from dry_run import PhaseTimer, write_jsonl
+from pb_mirror import MIRROR_DB, open_synced
+from pb_neardup import NearDuplicateIndex, DEFAULT_THRESHOLD
+
+# --------------------------
+# Единая загрузка файлов любого формата
+# --------------------------
+# Формат файла берётся из поля type: в YAML-блоке, а если его нет —
+# определяется по первой строке задания. Каждый формат приводится
+# к общему виду, дальше клиент, индекс тегов, темы, счётчики кодов
+# и загрузчик общие для всех файлов запуска. pb_parser.py и
+# pb_parser_mordkovich.py загружают через этот же движок (run_ingest),
+# только с заранее известным форматом.
+#
+# Общий вид разобранного файла:
+#   path, filename, format, metadata, topic, paragraph, subtopic,
+#   tasks: {ключ задачи: {"fields", "tag_titles", "hash"}},
+#   problems: [(уровень, ключ задачи, сообщение)]
+
+COLLECTION_NAME = "tasks"
+SOURCE_FOLDER = "source"
+
+
+# --------------------------
+# 1. Форматы
+# --------------------------
+def parse_bold(md_file: str) -> dict:
+    """Формат «**N** [сложность]» (pb_parser.py)"""
+    parsed = pb_parser.parse_file(md_file)
+    tasks = OrderedDict()
+    for num, task in parsed["tasks"].items():
+        tag_titles = []
+        if task["tag_titles"] is not None:
+            # Как в pb_parser: глобальные теги добавляются к задачам со строкой tags:
+            tag_titles = list(dict.fromkeys(parsed["global_tags"] + task["tag_titles"]))
+        tasks[str(num)] = {
+            "fields": pb_parser.base_record(parsed, task),
+            "tag_titles": tag_titles,
+            # Тот же хеш, что у pb_parser.py: манифест общий для обоих скриптов
+            "hash": pb_parser.task_fingerprint(parsed, task),
+        }
+    return {
+        "path": md_file,
+        "filename": parsed["filename"],
+        "metadata": parsed["metadata"],
+        "topic": parsed["topic"],
+        "paragraph": None,
+        "subtopic": parsed["subtopic"],
+        "tasks": tasks,
+        "problems": pb_parser.validate_parsed(parsed),
+    }
+
+
+def parse_mordkovich(md_file: str) -> dict:
+    """Задачник Мордковича: «14.1.» [сложность] с подпунктами (pb_parser_mordkovich.py)"""
+    filename = os.path.basename(md_file)
+    number = re.search(r"\d+(?:\.\d+)*", filename)
+    parsed = pb_parser_mordkovich.parse_file(md_file, number.group(0) if number else "")
+    tag_titles = pb_parser_mordkovich.split_tags(parsed["tags"])
+    tasks = OrderedDict()
+    for full_task_name, _, _, record in pb_parser_mordkovich.iter_records(parsed):
+        tasks[full_task_name] = {
+            "fields": record,
+            "tag_titles": tag_titles,
+            "hash": content_hash({"fields": record, "tags": tag_titles, "topic": parsed["topic"]}),
+        }
+    return {
+        "path": md_file,
+        "filename": filename,
+        "metadata": parsed["metadata"],
+        "topic": parsed["topic"],
+        "paragraph": parsed["paragraph"],
+        "subtopic": None,
+        "tasks": tasks,
+        "problems": pb_parser_mordkovich.validate(parsed),
+    }
+
+
+def parse_numbered(md_file: str) -> dict:
+    """Нумерованный список «1. условие» и таблица ответов «| 1 | ответ |» (source/16.md)"""
+    filename = os.path.basename(md_file)
+    with open(md_file, "r", encoding="utf-8") as f:
+        md_text = f.read()
+
+    metadata = read_front_matter(md_text)
+    if metadata is None:
+        raise ValueError("YAML-блок не найден!")
+    if not metadata.get("topic"):
+        raise ValueError("Поле 'topic' обязательно!")
+
+    statements, answers = read_numbered(md_text.split("\n"))
+    defaults = {
+        "difficulty": str(metadata.get("difficulty", "1")),
+        "source": metadata.get("source", "Не указан"),
+        "year": metadata.get("year", 2026),
+    }
+    # Своих тегов у заданий нет — глобальные теги получают все задания файла
+    tag_titles = parse_tags(metadata.get("tags", ""))
+
+    tasks = OrderedDict()
+    problems = []
+    for num, statement in statements.items():
+        record = pb_parser.base_record(defaults, {
+            "difficulty": defaults["difficulty"],
+            "statement_md": statement,
+            "answer": answers.get(num, ""),
+        })
+        tasks[str(num)] = {
+            "fields": record,
+            "tag_titles": tag_titles,
+            "hash": content_hash({"fields": record, "tags": tag_titles, "topic": metadata["topic"]}),
+        }
+        if not statement:
+            problems.append(("error", num, "пустое условие"))
+        if num not in answers:
+            problems.append(("warning", num, "нет ответа"))
+    for num in answers:
+        if num not in statements:
+            problems.append(("warning", num, "ответ без задания"))
+
+    return {
+        "path": md_file,
+        "filename": filename,
+        "metadata": metadata,
+        "topic": metadata["topic"],
+        "paragraph": None,
+        "subtopic": metadata.get("subtopic"),
+        "tasks": tasks,
+        "problems": problems,
+    }
+
+
+# Порядок важен: при определении формата шаблоны проверяются сверху вниз
+FORMATS = OrderedDict([
+    ("mordkovich", (MORDKOVICH_TASK_HEADER, parse_mordkovich)),
+    ("bold", (BOLD_TASK_HEADER, parse_bold)),
+    ("numbered", (NUMBERED_TASK_ITEM, parse_numbered)),
+])
+
+
+def detect_format(md_text: str) -> str:
+    """Формат из поля type: YAML-блока или по первой строке задания"""
+    yaml_block = FRONT_MATTER.search(md_text)
+    if yaml_block is None:
+        raise ValueError("YAML-блок не найден!")
+    metadata = read_front_matter(md_text) or {}
+
+    declared = metadata.get("type")
+    if declared:
+        if declared not in FORMATS:
+            raise ValueError(f"Неизвестный type: {declared} (известны: {', '.join(FORMATS)})")
+        return declared
+
+    for line in md_text[yaml_block.end():].split("\n"):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        for name, (pattern, _) in FORMATS.items():
+            if pattern.match(line):
+                return name
+    raise ValueError("Не удалось определить формат файла (укажите type: в YAML)")
+
+
+def parse_source(md_file: str, format_name: str = None) -> dict:
+    """Разбор файла в общий вид; без format_name формат определяется по файлу"""
+    if format_name is None:
+        with open(md_file, "r", encoding="utf-8") as f:
+            md_text = f.read()
+        format_name = detect_format(md_text)
+    parsed = FORMATS[format_name][1](md_file)
+    parsed["format"] = format_name
+    return parsed
+
+
+def parse_source_safe(md_file: str, format_name: str = None):
+    """Обёртка для пула процессов: ошибка возвращается, а не пробрасывается"""
+    try:
+        return parse_source(md_file, format_name), None
+    except Exception as e:
+        return None, str(e)
+
+
+def parse_sources(md_files, workers: int = None, format_name: str = None):
+    """Разбирает файлы параллельно в пуле процессов (один файл — в текущем процессе)"""
+    if len(md_files) == 1:
+        return [parse_source_safe(md_files[0], format_name)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(parse_source_safe, md_files, repeat(format_name)))
+
+
+def print_parsed(parsed: dict):
+    print(f"\n📄 Файл: {parsed['path']} (формат: {parsed['format']})")
+    print(f"   Тема: {parsed['topic']}")
+    print(f"✓ Найдено заданий: {len(parsed['tasks'])}")
+
+
+def print_problems(parsed: dict):
+    for level, key, message in parsed["problems"]:
+        icon = "❌" if level == "error" else "⚠️ "
+        print(f"{icon} {parsed['filename']}: задание {key}: {message}")
+
+
+def apply_manifest(manifest: IngestManifest, parsed: dict, stats: dict):
+    """Неизменённые задачи убираются, для изменённых запоминается ID записи"""
+    for key, task in list(parsed["tasks"].items()):
+        known = manifest.task(parsed["path"], key)
+        if not known:
+            continue
+        if known["hash"] == task["hash"]:
+            del parsed["tasks"][key]
+            stats["unchanged"] += 1
+        elif known["id"]:
+            task["record_id"] = known["id"]
+
+
+# --------------------------
+# 2. Общий движок загрузки
+# --------------------------
+class TopicState:
+    """Индекс дубликатов и счётчик кодов одной темы, общие для всех её файлов"""
+
+    def __init__(self, client: PocketBaseClient, topic_id: str, prefix: str = None, mirror=None):
+        self.topic_id = topic_id
+        print(f"\n🔍 Проверяю дубликаты в базе...")
+        self.existing_statements = StatementIndex.load(client, topic_id, mirror=mirror)
+        print(f"✓ Существующих задач в базе: {len(self.existing_statements)}")
+        self.code_allocator = CodeAllocator.for_topic(client, topic_id, prefix=prefix, mirror=mirror)
+
+
+class IngestEngine:
+    """
+    Клиент, индекс тегов, темы, индексы дубликатов, счётчики кодов
+    и загрузчик — одни на все файлы запуска, какого бы формата они ни были.
+    """
+
+    def __init__(self, client: PocketBaseClient, batch_size: int = DEFAULT_BATCH_SIZE,
+                 concurrency: int = DEFAULT_CONCURRENCY, mirror=None,
+                 near_dups: NearDuplicateIndex = None, skip_near_dups: bool = False):
+        self.client = client
+        # С локальным зеркалом (pb_mirror) темы, теги, дубликаты и коды ищутся без запросов
+        self.mirror = mirror
+        self.tag_index = TagIndex.load(client, mirror=mirror)
+        print(f"✓ Загружено тегов: {len(self.tag_index)}")
+        self.topic_ids = {}      # (название, параграф) -> ID темы
+        self.topic_states = {}   # (ID темы, префикс кода) -> TopicState
+        # Индекс всех условий базы (pb_neardup): новые задачи сверяются с ним на сходство
+        self.near_dups = near_dups
+        self.skip_near_dups = skip_near_dups
+        self.uploader = BatchUploader(
+            client, COLLECTION_NAME, batch_size=batch_size, concurrency=concurrency
+        )
+
+    def ensure_tags(self, parsed_files):
+        """Недостающие теги всех файлов создаются одним проходом"""
+        self.tag_index.ensure(
+            title
+            for parsed in parsed_files
+            for task in parsed["tasks"].values()
+            for title in task["tag_titles"]
+        )
+
+    def topic_id(self, parsed: dict) -> str:
+        key = (parsed["topic"], parsed["paragraph"])
+        if key not in self.topic_ids and self.mirror is not None:
+            topic = (self.mirror.topic_by_ege_number(f"M{parsed['paragraph']}") if parsed["paragraph"]
+                     else self.mirror.topic_by_title(parsed["topic"]))
+            if topic:
+                print(f"✓ Тема из зеркала: {topic['title']}")
+                self.topic_ids[key] = topic["id"]
+        if key not in self.topic_ids:
+            if parsed["paragraph"]:
+                # Параграф задачника: тема ищется по коду M{p} и создаётся при необходимости
+                self.topic_ids[key] = pb_parser_mordkovich.get_or_create_topic(
+                    self.client, parsed["paragraph"], parsed["topic"]
+                )
+            else:
+                self.topic_ids[key] = pb_parser.search_topic_interactive(self.client, parsed["topic"])
+        return self.topic_ids[key]
+
+    def topic_state(self, topic_id: str, prefix: str = None):
+        key = (topic_id, prefix)
+        if key not in self.topic_states:
+            self.topic_states[key] = TopicState(self.client, topic_id, prefix=prefix, mirror=self.mirror)
+        return self.topic_states[key]
+
+    def prepare(self, parsed: dict, stats: dict, manifest: IngestManifest = None):
+        """Находит тему файла, назначает теги и коды; возвращает записи к загрузке"""
+        filename = parsed["filename"]
+        print(f"\n{'='*60}\n📄 {filename} ({parsed['format']})")
+
+        topic_id = self.topic_id(parsed)
+
+        # Обновляем subtopic в topics если она указана
+        subtopic_name = parsed["subtopic"]
+        if subtopic_name:
+            try:
+                update_resp = self.client.topics.update(topic_id, {"subtopic": subtopic_name})
+                if update_resp.status_code == 200:
+                    print(f"✓ Подтема '{subtopic_name}' установлена для темы")
+                else:
+                    print(f"⚠️ Не удалось обновить подтему: {update_resp.text}")
+            except Exception as e:
+                print(f"⚠️ Ошибка при обновлении подтемы: {e}")
+
+        prefix = f"M{parsed['paragraph']}-" if parsed["paragraph"] else None
+        state = self.topic_state(topic_id, prefix)
+
+        # Коды назначаются до отправки, поэтому не зависят от порядка ответов сервера
+        upload_items = []
+        new_records = []
+        near_meta = []
+        for key, task in parsed["tasks"].items():
+            fields = task["fields"]
+            statement = fields["statement_md"]
+            record_id = task.get("record_id")
+
+            if record_id:
+                # Задача уже загружалась и изменилась: обновляем её запись, код сохраняется
+                state.existing_statements.add(statement)
+            elif statement in state.existing_statements:
+                print(f"⚠️  Задание {key}: пропущено (дубликат)")
+                stats["skipped"] += 1
+                if manifest is not None:
+                    manifest.record_task(parsed["path"], key, task["hash"], None)
+                continue
+            else:
+                if self.near_dups is not None and self.is_near_duplicate(key, statement, stats):
+                    # В манифест не пишем: следующий запуск сверит задачу заново
+                    continue
+                # Повтор того же условия дальше в файле тоже считается дубликатом
+                state.existing_statements.add(statement)
+
+            record_data = {"topic": topic_id}
+            record_data.update(fields)
+            tag_ids = self.tag_index.ids(task["tag_titles"])
+            if tag_ids:
+                record_data["tags"] = tag_ids
+
+            if record_id:
+                upload_items.append(((parsed["path"], key), record_data, record_id))
+            else:
+                new_records.append(record_data)
+                upload_items.append(((parsed["path"], key), record_data))
+                if self.near_dups is not None:
+                    # Похожие задачи дальше в этом же запуске тоже найдутся; код допишется ниже
+                    near_meta.append({"code": None, "topic": topic_id})
+                    self.near_dups.add(f"{filename}: задание {key}", statement, near_meta[-1])
+
+        # Коды новых задач файла — один непрерывный диапазон
+        state.code_allocator.assign(new_records)
+        for meta, record_data in zip(near_meta, new_records):
+            meta["code"] = record_data["code"]
+        return upload_items
+
+    def is_near_duplicate(self, key, statement: str, stats: dict) -> bool:
+        """Предупреждает о похожих задачах; True — задачу нужно пропустить"""
+        matches = self.near_dups.query(statement)
+        if not matches:
+            return False
+        stats["near_duplicates"] = stats.get("near_duplicates", 0) + 1
+        similar = ", ".join(f"{meta.get('code') or match_key} ({similarity:.2f})"
+                            for match_key, similarity, meta in matches[:3])
+        if self.skip_near_dups:
+            print(f"⚠️  Задание {key}: пропущено (похоже на {similar})")
+            stats["skipped"] += 1
+            stats["near_skipped"] = stats.get("near_skipped", 0) + 1
+            return True
+        print(f"🔁 Задание {key}: похоже на {similar}")
+        return False
+
+    def upload(self, upload_items):
+        """(ключ, запись, ok, ответ) в порядке отправки"""
+        return self.uploader.upload(upload_items)
+
+
+# --------------------------
+# 3. Режим проверки без сервера
+# --------------------------
+def dry_run(md_files, workers, jsonl_path: str = "-"):
+    """Разбор и проверка файлов, вывод будущих записей в JSONL без единого запроса"""
+    timer = PhaseTimer()
+    errors = 0
+    warnings = 0
+    # Человекочитаемый вывод уходит в stderr, stdout остаётся под JSONL
+    with redirect_stdout(sys.stderr):
+        print(f"\n📝 Парсинг файлов: {len(md_files)}")
+        with timer.phase("разбор"):
+            results = parse_sources(md_files, workers)
+
+        parsed_files = []
+        for md_file, (parsed, error) in zip(md_files, results):
+            if error is None and not parsed["tasks"]:
+                error = "Задания не найдены!"
+            if error:
+                print(f"\n❌ {md_file}: {error}")
+                errors += 1
+                continue
+            print_parsed(parsed)
+            print_problems(parsed)
+            parsed_files.append(parsed)
+            errors += sum(1 for level, _, _ in parsed["problems"] if level == "error")
+            warnings += sum(1 for level, _, _ in parsed["problems"] if level == "warning")
+
+    def records():
+        for parsed in parsed_files:
+            for key, task in parsed["tasks"].items():
+                record = {"file": parsed["filename"], "format": parsed["format"], "key": key,
+                          "code": None, "topic": parsed["topic"]}
+                record.update(task["fields"])
+                if task["tag_titles"]:
+                    record["tags"] = task["tag_titles"]
+                yield record
+
+    with timer.phase("вывод JSONL"):
+        count = write_jsonl(records(), jsonl_path)
+
+    print(f"\n🧪 Проверка без сервера: записей {count}, ошибок {errors}, "
+          f"предупреждений {warnings}", file=sys.stderr)
+    timer.report()
+    return errors
+
+
+# --------------------------
+# 4. Загрузка
+# --------------------------
+def add_ingest_arguments(arg_parser: argparse.ArgumentParser):
+    """Флаги загрузки, общие для pb_ingest.py, pb_parser.py и pb_parser_mordkovich.py"""
+    arg_parser.add_argument(
+        "--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+        help=f"сколько задач отправлять одним пакетным запросом (по умолчанию {DEFAULT_BATCH_SIZE}, 1 — без пакетов)"
+    )
+    arg_parser.add_argument(
+        "--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+        help="сколько запросов на загрузку держать в пути одновременно (по умолчанию 1 — последовательно)"
+    )
+    arg_parser.add_argument(
+        "--manifest", default=MANIFEST_FILE,
+        help=f"файл манифеста инкрементальной загрузки (по умолчанию {MANIFEST_FILE})"
+    )
+    arg_parser.add_argument(
+        "--no-manifest", action="store_true",
+        help="не использовать манифест: разобрать и сверить с базой все файлы и задачи"
+    )
+    arg_parser.add_argument(
+        "--mirror", action="store_true",
+        help=f"искать темы, теги, дубликаты и коды в локальном зеркале {MIRROR_DB} "
+             "(перед загрузкой оно досинхронизируется)"
+    )
+    arg_parser.add_argument(
+        "--near-dups", choices=("warn", "skip"),
+        help="сверять новые задачи со всей коллекцией на почти полное совпадение условий (pb_neardup.py): "
+             "warn — предупредить, skip — не загружать"
+    )
+    arg_parser.add_argument(
+        "--near-dup-threshold", type=float, default=DEFAULT_THRESHOLD,
+        help=f"порог сходства для --near-dups (по умолчанию {DEFAULT_THRESHOLD})"
+    )
+
+
+def print_summary(file_stats: dict):
+    multiple = len(file_stats) > 1
+    if multiple:
+        print("\n" + "="*60)
+        print("📁 ИТОГИ ПО ФАЙЛАМ:")
+        for filename, stats in file_stats.items():
+            if stats.get("error"):
+                print(f"   ❌ {filename}: {stats['error']}")
+            elif stats.get("unchanged_file"):
+                print(f"   💤 {filename}: файл не менялся")
+            else:
+                print(f"   {filename}: добавлено {stats['added']}, обновлено {stats['updated']}, "
+                      f"без изменений {stats['unchanged']}, пропущено {stats['skipped']}, "
+                      f"ошибок {stats['errors']}, всего {stats['total']}")
+
+    totals = {key: sum(s.get(key, 0) for s in file_stats.values())
+              for key in ("added", "updated", "unchanged", "skipped", "near_duplicates", "errors", "total")}
+    print("\n" + "="*60)
+    print(f"📊 ИТОГОВАЯ СТАТИСТИКА:")
+    print(f"   ✅ Добавлено: {totals['added']}")
+    print(f"   ♻️  Обновлено: {totals['updated']}")
+    print(f"   💤 Без изменений: {totals['unchanged']}")
+    print(f"   ⚠️  Пропущено (дубликаты): {totals['skipped']}")
+    if totals["near_duplicates"]:
+        print(f"   🔁 Похожи на задачи из базы: {totals['near_duplicates']}")
+    print(f"   ❌ Ошибки: {totals['errors']}")
+    print(f"   📝 Всего обработано: {totals['total']}")
+    print("="*60)
+
+
+def run_ingest(md_files, args, format_name: str = None, workers: int = None) -> bool:
+    """
+    Загрузка файлов с флагами add_ingest_arguments() и итоговая сводка.
+    format_name — формат всех файлов (без него определяется по каждому файлу).
+    Возвращает False, если хотя бы один файл или задача не загрузились.
+    """
+    file_stats = OrderedDict()
+    manifest = None if args.no_manifest else IngestManifest.load(args.manifest)
+    if manifest is not None:
+        # Неизменённые файлы пропускаем, даже не открывая
+        changed_files = []
+        for md_file in md_files:
+            if manifest.file_unchanged(md_file):
+                print(f"💤 {md_file}: без изменений")
+                file_stats[md_file] = {"unchanged_file": True}
+            else:
+                changed_files.append(md_file)
+        md_files = changed_files
+
+    # --------------------------
+    # Парсинг всех файлов
+    # --------------------------
+    print(f"\n📝 Парсинг файлов: {len(md_files)}")
+    parsed_files = []
+    results = parse_sources(md_files, workers, format_name) if md_files else []
+    for md_file, (parsed, error) in zip(md_files, results):
+        if error is None and not parsed["tasks"]:
+            error = "Задания не найдены!"
+        if error:
+            print(f"\n❌ {md_file}: {error}")
+            file_stats[md_file] = {"error": error}
+            continue
+        print_parsed(parsed)
+        print_problems(parsed)
+        stats = {"added": 0, "updated": 0, "unchanged": 0, "skipped": 0, "errors": 0,
+                 "total": len(parsed["tasks"])}
+        file_stats[md_file] = stats
+        if manifest is not None:
+            apply_manifest(manifest, parsed, stats)
+            if not parsed["tasks"]:
+                # Все задачи уже загружены — файл можно отметить без обращения к серверу
+                manifest.mark_file(md_file)
+                continue
+        parsed_files.append(parsed)
+
+    failed = any(stats.get("error") for stats in file_stats.values())
+    if not parsed_files:
+        if manifest is not None:
+            manifest.save()
+        if not failed:
+            print("\n✓ Нечего загружать: все задачи уже в базе")
+        print_summary(file_stats)
+        return not failed
+
+    # --------------------------
+    # Авторизация и общие кэши (одни на все файлы и форматы)
+    # --------------------------
+    client = PocketBaseClient(pool_size=max(DEFAULT_POOL_SIZE, args.concurrency))
+    client.login()
+    print("\n✅ Авторизация прошла успешно")
+
+    mirror = open_synced(client) if args.mirror else None
+    near_dups = None
+    if args.near_dups:
+        near_dups = NearDuplicateIndex.load(client, mirror=mirror, threshold=args.near_dup_threshold)
+        print(f"✓ Индекс похожих задач: {len(near_dups)} условий")
+    engine = IngestEngine(client, batch_size=args.batch_size, concurrency=args.concurrency, mirror=mirror,
+                          near_dups=near_dups, skip_near_dups=args.near_dups == "skip")
+    print("\n🏷️  Обработка тегов...")
+    engine.ensure_tags(parsed_files)
+
+    upload_items = []
+    for parsed in parsed_files:
+        upload_items.extend(engine.prepare(parsed, file_stats[parsed["path"]], manifest))
+    # Ключ — путь: одноимённые файлы из разных папок не смешиваются
+    parsed_by_path = {parsed["path"]: parsed for parsed in parsed_files}
+
+    # --------------------------
+    # Загрузка одним конвейером
+    # --------------------------
+    print(f"\n📤 Начинаю загрузку задач...")
+    print("="*60)
+
+    multiple = len(parsed_files) > 1
+    for (path, key), record_data, ok, detail in engine.upload(upload_items):
+        parsed = parsed_by_path[path]
+        label = f"{parsed['filename']}: задание {key}" if multiple else f"Задание {key}"
+        stats = file_stats[path]
+        if ok:
+            if "code" in record_data:
+                task_tags = record_data.get("tags", [])
+                tags_info = f" (теги: {len(task_tags)})" if task_tags else ""
+                print(f"✅ {label}: добавлено с кодом {record_data['code']}{tags_info}")
+                stats["added"] += 1
+            else:
+                print(f"♻️  {label}: обновлено ({detail.get('code', detail['id'])})")
+                stats["updated"] += 1
+            if manifest is not None:
+                manifest.record_task(path, key, parsed["tasks"][key]["hash"], detail["id"])
+        else:
+            print(f"❌ {label}: {detail}")
+            stats["errors"] += 1
+
+    if manifest is not None:
+        # Файл считается загруженным только если ни одна его задача не упала
+        # и не отложена как похожая (--near-dups skip) — иначе повторный запуск её не увидит
+        for parsed in parsed_files:
+            stats = file_stats[parsed["path"]]
+            if stats["errors"] == 0 and not stats.get("near_skipped"):
+                manifest.mark_file(parsed["path"])
+        manifest.save()
+
+    print_summary(file_stats)
+    return not failed and not any(stats.get("errors") for stats in file_stats.values())
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description="Загрузка задач в PocketBase из Markdown любого поддерживаемого формата "
+                    f"({', '.join(FORMATS)})",
+        epilog="Примеры: python3 pb_ingest.py --all | "
+               "python3 pb_ingest.py 16 16-1 source/mordkovich/M16.md --dry-run > tasks.jsonl"
+    )
+    arg_parser.add_argument(
+        "files", nargs="*",
+        help="имена файлов в папке source (расширение .md можно не указывать), пути или шаблоны"
+    )
+    arg_parser.add_argument(
+        "--all", action="store_true",
+        help=f"загрузить все .md файлы из папки {SOURCE_FOLDER} и её подпапок"
+    )
+    arg_parser.add_argument(
+        "--workers", type=int, default=None,
+        help="сколько процессов использовать для парсинга нескольких файлов (по умолчанию — по числу ядер)"
+    )
+    add_ingest_arguments(arg_parser)
+    arg_parser.add_argument(
+        "--dry-run", action="store_true",
+        help="только разобрать и проверить файлы, не обращаясь к серверу и не трогая манифест; "
+             "записи выводятся в JSONL"
+    )
+    arg_parser.add_argument(
+        "--jsonl", default="-",
+        help="куда писать записи в режиме --dry-run (по умолчанию '-' — стандартный вывод)"
+    )
+    args = arg_parser.parse_args()
+
+    if not args.files and not args.all:
+        arg_parser.error("укажите файл(ы) или --all")
+
+    if args.all:
+        md_files = sorted(glob.glob(os.path.join(SOURCE_FOLDER, "**", "*.md"), recursive=True))
+    else:
+        md_files = pb_parser.resolve_md_files(args.files)
+    if not md_files:
+        print(f"❌ Не найдено ни одного .md файла")
+        sys.exit(1)
+
+    if args.dry_run:
+        sys.exit(1 if dry_run(md_files, args.workers, args.jsonl) else 0)
+
+    sys.exit(0 if run_ingest(md_files, args, workers=args.workers) else 1)
+
+
+if __name__ == "__main__":
+    main()
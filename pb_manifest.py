@@ -0,0 +1,89 @@
+import os
+import json
+import hashlib
+
+# --------------------------
+# Манифест инкрементальной загрузки
+# --------------------------
+# Для каждого исходного файла хранится его размер, mtime и sha256,
+# а для каждой задачи — хеш содержимого и ID записи в PocketBase.
+# Неизменённый файл пропускается без единого запроса к серверу,
+# из изменённого отправляются только новые и изменённые задачи.
+
+MANIFEST_FILE = ".ingest_manifest.json"
+MANIFEST_VERSION = 1
+
+
+def content_hash(data) -> str:
+    """Хеш содержимого задачи (любой JSON-сериализуемой структуры)"""
+    raw = json.dumps(data, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class IngestManifest:
+
+    def __init__(self, path: str = MANIFEST_FILE):
+        self.path = path
+        self.files = {}
+
+    @classmethod
+    def load(cls, path: str = MANIFEST_FILE):
+        manifest = cls(path)
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == MANIFEST_VERSION:
+                manifest.files = data.get("files", {})
+        return manifest
+
+    def save(self):
+        # Пишем во временный файл и подменяем — манифест не бьётся при падении
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": MANIFEST_VERSION, "files": self.files}, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
+
+    @staticmethod
+    def key(path: str) -> str:
+        return os.path.normpath(path)
+
+    def _entry(self, path: str) -> dict:
+        return self.files.setdefault(self.key(path), {"tasks": {}})
+
+    def file_unchanged(self, path: str) -> bool:
+        """Файл уже полностью загружен и с тех пор не менялся"""
+        entry = self.files.get(self.key(path))
+        if not entry or "sha256" not in entry:
+            return False
+        st = os.stat(path)
+        if entry.get("size") == st.st_size and entry.get("mtime") == st.st_mtime:
+            return True
+        # mtime мог смениться без правки (git checkout, копирование) — сверяем содержимое
+        if entry.get("size") == st.st_size and entry["sha256"] == file_sha256(path):
+            entry["mtime"] = st.st_mtime
+            return True
+        return False
+
+    def mark_file(self, path: str):
+        """Запоминает состояние файла после успешной загрузки"""
+        st = os.stat(path)
+        entry = self._entry(path)
+        entry.update({"size": st.st_size, "mtime": st.st_mtime, "sha256": file_sha256(path)})
+
+    def task(self, path: str, task_key: str):
+        """Запись о задаче: {"hash": ..., "id": ...} или None"""
+        entry = self.files.get(self.key(path))
+        if not entry:
+            return None
+        return entry["tasks"].get(str(task_key))
+
+    def record_task(self, path: str, task_key: str, task_hash: str, record_id):
+        self._entry(path)["tasks"][str(task_key)] = {"hash": task_hash, "id": record_id}
@@ -0,0 +1,221 @@
+import argparse
+import sqlite3
+
+from pb_client import PocketBaseClient
+from pb_dedup import statement_hash
+from pb_tags import normalize_tag
+
+# --------------------------
+# Локальное зеркало tasks / topics / tags
+# --------------------------
+# Нужные для поиска поля трёх коллекций хранятся в SQLite. Синхронизация
+# инкрементальная: с сервера запрашиваются только записи с updated не раньше
+# последней синхронизации, а удалённые записи находятся сверкой числа записей.
+# После синхронизации тема по названию и максимальный код ищутся по индексам
+# SQLite, а теги и условия темы читаются отсюда в TagIndex и StatementIndex —
+# без обращения к серверу.
+
+MIRROR_DB = ".pb_mirror.sqlite3"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS topics (
+    id TEXT PRIMARY KEY, title TEXT, ege_number TEXT, updated TEXT
+);
+CREATE INDEX IF NOT EXISTS topics_title ON topics (title);
+CREATE INDEX IF NOT EXISTS topics_ege_number ON topics (ege_number);
+
+CREATE TABLE IF NOT EXISTS tags (
+    id TEXT PRIMARY KEY, title TEXT, title_key TEXT, updated TEXT
+);
+CREATE INDEX IF NOT EXISTS tags_title_key ON tags (title_key);
+
+CREATE TABLE IF NOT EXISTS tasks (
+    id TEXT PRIMARY KEY, topic TEXT, code TEXT, code_prefix TEXT, code_num INTEGER,
+    statement_md TEXT, statement_hash BLOB, updated TEXT
+);
+CREATE INDEX IF NOT EXISTS tasks_code ON tasks (topic, code_prefix, code_num);
+CREATE INDEX IF NOT EXISTS tasks_statement ON tasks (topic, statement_hash);
+
+CREATE TABLE IF NOT EXISTS sync_state (collection TEXT PRIMARY KEY, updated TEXT);
+"""
+
+
+def split_code(code: str):
+    """'14-007' -> ('14-', 7), 'M14-012' -> ('M14-', 12); номер None, если не число"""
+    head, sep, tail = (code or "").rpartition("-")
+    if not sep:
+        return None, None
+    return f"{head}-", int(tail) if tail.isdigit() else None
+
+
+def topic_row(record: dict):
+    return record["id"], record.get("title", ""), str(record.get("ege_number") or ""), record.get("updated", "")
+
+
+def tag_row(record: dict):
+    title = record.get("title", "")
+    return record["id"], title, normalize_tag(title), record.get("updated", "")
+
+
+def task_row(record: dict):
+    code = record.get("code") or ""
+    prefix, num = split_code(code)
+    statement = record.get("statement_md") or ""
+    return (record["id"], record.get("topic", ""), code, prefix, num,
+            statement, statement_hash(statement), record.get("updated", ""))
+
+
+# коллекция -> (поля для запроса, строка таблицы из записи, столбцы таблицы)
+COLLECTIONS = {
+    "topics": ("id,title,ege_number,updated", topic_row, "id, title, ege_number, updated"),
+    "tags": ("id,title,updated", tag_row, "id, title, title_key, updated"),
+    "tasks": ("id,topic,code,statement_md,updated", task_row,
+              "id, topic, code, code_prefix, code_num, statement_md, statement_hash, updated"),
+}
+
+
+class PocketBaseMirror:
+    """Зеркало коллекций в SQLite: sync() подтягивает изменения, остальные методы ищут локально"""
+
+    def __init__(self, path: str = MIRROR_DB):
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    # --------------------------
+    # Синхронизация
+    # --------------------------
+    def sync(self, client: PocketBaseClient, full: bool = False) -> dict:
+        """Подтягивает изменения всех коллекций; возвращает {коллекция: (обновлено, удалено)}"""
+        return {name: self.sync_collection(client, name, full) for name in COLLECTIONS}
+
+    def sync_collection(self, client: PocketBaseClient, name: str, full: bool = False):
+        fields, make_row, columns = COLLECTIONS[name]
+        collection = client.collection(name)
+        placeholders = ", ".join("?" * len(columns.split(",")))
+
+        if full:
+            with self.conn:
+                self.conn.execute(f"DELETE FROM {name}")
+                self.conn.execute("DELETE FROM sync_state WHERE collection = ?", (name,))
+        row = self.conn.execute("SELECT updated FROM sync_state WHERE collection = ?", (name,)).fetchone()
+        since = row[0] if row else None
+
+        # '>=' а не '>': запись, изменённая в ту же миллисекунду после прошлой
+        # синхронизации, не потеряется — повторная вставка ничего не портит
+        since_filter = f'updated >= "{since}"' if since else None
+        updated = 0
+        last = since
+        rows = []
+        # id — второй ключ: у записей пакетного импорта одинаковый updated, и без
+        # однозначного порядка постраничный обход мог бы пропустить их на границе страниц
+        for record in collection.iter_all(filter=since_filter, fields=fields, sort="updated,id"):
+            rows.append(make_row(record))
+            last = max(last or "", record.get("updated", ""))
+            if len(rows) >= 500:
+                updated += self._upsert(name, columns, placeholders, rows)
+                rows = []
+        updated += self._upsert(name, columns, placeholders, rows)
+        if last:
+            with self.conn:
+                self.conn.execute("INSERT OR REPLACE INTO sync_state (collection, updated) VALUES (?, ?)",
+                                  (name, last))
+
+        return updated, self._drop_deleted(client, name)
+
+    def _upsert(self, name, columns, placeholders, rows) -> int:
+        """Вставляет и обновляет записи; возвращает, сколько из них действительно изменилось"""
+        if not rows:
+            return 0
+        assignments = ", ".join(f"{column} = excluded.{column}" for column in columns.split(", ")[1:])
+        before = self.conn.total_changes
+        with self.conn:
+            self.conn.executemany(
+                f"INSERT INTO {name} ({columns}) VALUES ({placeholders}) "
+                f"ON CONFLICT (id) DO UPDATE SET {assignments} WHERE excluded.updated != {name}.updated",
+                rows
+            )
+        return self.conn.total_changes - before
+
+    def _drop_deleted(self, client: PocketBaseClient, name: str) -> int:
+        """Удалённые на сервере записи: сначала сверка числа записей, список ID — только при расхождении"""
+        resp = client.request("GET", f"/api/collections/{name}/records", params={"perPage": 1, "fields": "id"})
+        resp.raise_for_status()
+        total = resp.json().get("totalItems")
+        local = self.conn.execute(f"SELECT COUNT(*) FROM {name}").fetchone()[0]
+        if total is None or total == local:
+            return 0
+        server_ids = {record["id"] for record in client.collection(name).iter_all(fields="id")}
+        stale = [(record_id,) for (record_id,) in self.conn.execute(f"SELECT id FROM {name}")
+                 if record_id not in server_ids]
+        with self.conn:
+            self.conn.executemany(f"DELETE FROM {name} WHERE id = ?", stale)
+        return len(stale)
+
+    # --------------------------
+    # Поиск
+    # --------------------------
+    def counts(self) -> dict:
+        return {name: self.conn.execute(f"SELECT COUNT(*) FROM {name}").fetchone()[0] for name in COLLECTIONS}
+
+    def _topic_where(self, condition: str, value: str):
+        row = self.conn.execute(f"SELECT id, title, ege_number FROM topics WHERE {condition} = ?",
+                                (value,)).fetchone()
+        return dict(zip(("id", "title", "ege_number"), row)) if row else None
+
+    def topic(self, topic_id: str):
+        return self._topic_where("id", topic_id)
+
+    def topic_by_title(self, title: str):
+        return self._topic_where("title", title)
+
+    def topic_by_ege_number(self, ege_number: str):
+        return self._topic_where("ege_number", str(ege_number))
+
+    def tags(self):
+        """Пары (ID, название) всех тегов"""
+        return self.conn.execute("SELECT id, title FROM tags").fetchall()
+
+    def max_code_number(self, topic_id: str, prefix: str) -> int:
+        row = self.conn.execute("SELECT MAX(code_num) FROM tasks WHERE topic = ? AND code_prefix = ?",
+                                (topic_id, prefix)).fetchone()
+        return row[0] or 0
+
+    def tasks(self):
+        """Четвёрки (ID, код, ID темы, условие) всех задач"""
+        return self.conn.execute("SELECT id, code, topic, statement_md FROM tasks")
+
+    def statements(self, topic_id: str):
+        """Пары (хеш условия, ID задачи) темы"""
+        return self.conn.execute("SELECT statement_hash, id FROM tasks WHERE topic = ?", (topic_id,)).fetchall()
+
+
+def open_synced(client: PocketBaseClient, path: str = MIRROR_DB, full: bool = False) -> PocketBaseMirror:
+    """Открывает зеркало, синхронизирует его и печатает, сколько записей изменилось"""
+    mirror = PocketBaseMirror(path)
+    changes = mirror.sync(client, full=full)
+    summary = ", ".join(f"{name} +{updated}/-{deleted}" for name, (updated, deleted) in changes.items())
+    print(f"✓ Зеркало {path} синхронизировано: {summary}")
+    return mirror
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Синхронизация локального зеркала PocketBase")
+    arg_parser.add_argument("--full", action="store_true", help="перечитать коллекции целиком")
+    arg_parser.add_argument("--path", default=MIRROR_DB, help=f"файл зеркала (по умолчанию {MIRROR_DB})")
+    args = arg_parser.parse_args()
+
+    client = PocketBaseClient()
+    client.login()
+    mirror = open_synced(client, args.path, full=args.full)
+    for name, count in mirror.counts().items():
+        print(f"   {name}: {count}")
+    mirror.close()
+
+
+if __name__ == "__main__":
+    main()
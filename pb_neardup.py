@@ -0,0 +1,251 @@
+import re
+import sys
+import zlib
+import random
+import argparse
+from contextlib import redirect_stdout
+
+try:
+    import numpy as np
+except ImportError:     # без NumPy сигнатуры считаются циклом на Python — результат тот же
+    np = None
+
+from pb_client import PocketBaseClient
+from pb_dedup import normalize_statement
+from pb_mirror import open_synced
+from dry_run import write_jsonl
+
+# --------------------------
+# Поиск почти одинаковых задач (MinHash + LSH)
+# --------------------------
+# Точная проверка (pb_dedup) ловит только одинаковые после нормализации условия
+# внутри одной темы. Здесь условие разбивается на токены LaTeX, из токенов
+# строятся тройки (шинглы), а множество шинглов сжимается в MinHash-сигнатуру.
+# Сигнатура режется на полосы (LSH): задачи с совпавшей полосой — кандидаты,
+# и только для них считается точное сходство Жаккара. Поэтому поиск по всей
+# коллекции не сравнивает все пары задач.
+
+NUM_PERM = 64           # длина сигнатуры
+BANDS = 16              # полос по NUM_PERM // BANDS значений
+SHINGLE_SIZE = 3        # токенов в шингле
+DEFAULT_THRESHOLD = 0.8
+SEED = 20250101
+
+MASK64 = (1 << 64) - 1
+
+# Индекс из одного символа или команды ('_2', '^\circ'), команда LaTeX, число, слово или одиночный символ.
+# Индекс — отдельный токен: после нормализации '\log_2 112' и '\log_{2}112' оба дают '\log_2112'
+TOKEN = re.compile(r"[_^](?:\\[A-Za-z]+|[^{\s])|\\[A-Za-z]+|\\.|\d+(?:[.,]\d+)?|[^\W\d_]+|\S")
+# '_{2}' -> '_2': фигурные скобки вокруг одного символа индекса
+SINGLE_SCRIPT = re.compile(r"([_^])\{(\\[A-Za-z]+|[^{}\s\\])\}")
+# Не влияют на смысл: скобки групп, разделители формул, отступы и \left/\right
+IGNORED_TOKENS = {"{", "}", "$", "\\left", "\\right", "\\,", "\\;", "\\!", "\\quad", "\\qquad", "\\displaystyle"}
+TOKEN_ALIASES = {"\\dfrac": "\\frac", "\\tfrac": "\\frac", "\\le": "\\leq", "\\ge": "\\geq", "\\ne": "\\neq"}
+
+
+def tokenize(statement: str) -> list:
+    """Токены условия: команды LaTeX, индексы, числа, слова в нижнем регистре, знаки"""
+    tokens = []
+    for token in TOKEN.findall(SINGLE_SCRIPT.sub(r"\1\2", normalize_statement(statement))):
+        token = TOKEN_ALIASES.get(token, token)
+        if token not in IGNORED_TOKENS:
+            # Регистр команд значим: \Delta ≠ \delta
+            tokens.append(token if token.startswith("\\") else token.lower())
+    return tokens
+
+
+def shingles(statement: str) -> frozenset:
+    """32-битные хеши троек соседних токенов (короткое условие — один шингл)"""
+    tokens = tokenize(statement)
+    if len(tokens) <= SHINGLE_SIZE:
+        grams = [tokens] if tokens else []
+    else:
+        grams = (tokens[i:i + SHINGLE_SIZE] for i in range(len(tokens) - SHINGLE_SIZE + 1))
+    return frozenset(zlib.crc32("\x1f".join(gram).encode("utf-8")) for gram in grams)
+
+
+def jaccard(a: frozenset, b: frozenset) -> float:
+    # Пустое условие ни на что не похоже, даже на другое пустое
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class MinHasher:
+    """
+    MinHash-сигнатуры: для каждой из num_perm функций h(x) = ((a*x + b) mod 2^64) >> 32
+    берётся минимум по шинглам. С NumPy и без неё сигнатуры совпадают.
+    """
+
+    def __init__(self, num_perm: int = NUM_PERM, seed: int = SEED):
+        rnd = random.Random(seed)
+        self.a = [rnd.getrandbits(64) | 1 for _ in range(num_perm)]
+        self.b = [rnd.getrandbits(64) for _ in range(num_perm)]
+        if np is not None:
+            self.a_np = np.array(self.a, dtype=np.uint64)[:, None]
+            self.b_np = np.array(self.b, dtype=np.uint64)[:, None]
+
+    def signature(self, shingle_set: frozenset) -> tuple:
+        """Сигнатура непустого множества шинглов"""
+        if np is not None:
+            x = np.fromiter(shingle_set, dtype=np.uint64, count=len(shingle_set))[None, :]
+            # Переполнение uint64 здесь и есть mod 2^64
+            return tuple((((self.a_np * x + self.b_np) >> np.uint64(32)).min(axis=1)).tolist())
+        return tuple(min(((a * x + b) & MASK64) >> 32 for x in shingle_set)
+                     for a, b in zip(self.a, self.b))
+
+
+class NearDuplicateIndex:
+    """
+    Индекс условий для поиска почти одинаковых задач.
+    add() добавляет условие, query() ищет похожие на новое условие,
+    pairs() отдаёт все похожие пары внутри индекса.
+    """
+
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD, num_perm: int = NUM_PERM, bands: int = BANDS):
+        if num_perm % bands:
+            raise ValueError("num_perm должно делиться на bands")
+        self.threshold = threshold
+        self.rows = num_perm // bands
+        self.hasher = MinHasher(num_perm)
+        self.keys = []
+        self.meta = []
+        self.shingle_sets = []
+        self.buckets = [{} for _ in range(bands)]
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _bands(self, signature: tuple):
+        for band in range(len(self.buckets)):
+            yield band, signature[band * self.rows:(band + 1) * self.rows]
+
+    def add(self, key, statement: str, meta: dict = None):
+        """Добавляет условие; пустое (без токенов) не индексируется"""
+        shingle_set = shingles(statement)
+        if not shingle_set:
+            return
+        item = len(self.keys)
+        self.keys.append(key)
+        self.meta.append(meta or {})
+        self.shingle_sets.append(shingle_set)
+        for band, value in self._bands(self.hasher.signature(shingle_set)):
+            self.buckets[band].setdefault(value, []).append(item)
+
+    def query(self, statement: str) -> list:
+        """Похожие условия: [(ключ, сходство, meta)] по убыванию сходства"""
+        shingle_set = shingles(statement)
+        if not shingle_set:
+            return []
+        candidates = set()
+        for band, value in self._bands(self.hasher.signature(shingle_set)):
+            candidates.update(self.buckets[band].get(value, ()))
+        matches = []
+        for item in candidates:
+            similarity = jaccard(shingle_set, self.shingle_sets[item])
+            if similarity >= self.threshold:
+                matches.append((self.keys[item], similarity, self.meta[item]))
+        matches.sort(key=lambda match: -match[1])
+        return matches
+
+    def pairs(self):
+        """Все пары (ключ, ключ, сходство) со сходством не ниже порога"""
+        seen = set()
+        for buckets in self.buckets:
+            for items in buckets.values():
+                for i, first in enumerate(items):
+                    for second in items[i + 1:]:
+                        if (first, second) in seen:
+                            continue
+                        seen.add((first, second))
+                        similarity = jaccard(self.shingle_sets[first], self.shingle_sets[second])
+                        if similarity >= self.threshold:
+                            yield self.keys[first], self.keys[second], similarity
+
+    @classmethod
+    def load(cls, client: PocketBaseClient, mirror=None, threshold: float = DEFAULT_THRESHOLD):
+        """Все задачи коллекции: постранично с сервера или из локального зеркала (pb_mirror)"""
+        index = cls(threshold)
+        if mirror is not None:
+            rows = mirror.tasks()
+        else:
+            rows = ((task["id"], task.get("code", ""), task.get("topic", ""), task.get("statement_md", ""))
+                    for task in client.tasks.iter_all(fields="id,code,topic,statement_md"))
+        for task_id, code, topic_id, statement in rows:
+            index.add(task_id, statement or "", {"code": code, "topic": topic_id, "statement_md": statement})
+        return index
+
+
+# --------------------------
+# Отчёт по всей коллекции
+# --------------------------
+def group_pairs(pairs) -> list:
+    """Связные группы похожих задач: [(ключи группы, максимальное сходство)]"""
+    parent = {}
+
+    def find(key):
+        parent.setdefault(key, key)
+        while parent[key] != key:
+            parent[key] = parent[parent[key]]
+            key = parent[key]
+        return key
+
+    best = {}
+    for first, second, similarity in pairs:
+        root_a, root_b = find(first), find(second)
+        if root_a != root_b:
+            parent[root_b] = root_a
+            best[root_a] = max(best.get(root_a, 0), best.pop(root_b, 0))
+        best[root_a] = max(best.get(root_a, 0), similarity)
+
+    groups = {}
+    for key in parent:
+        groups.setdefault(find(key), []).append(key)
+    return sorted(((members, best[root]) for root, members in groups.items()),
+                  key=lambda group: (-group[1], -len(group[0])))
+
+
+def print_report(index: NearDuplicateIndex, groups: list, topic_titles: dict):
+    meta_by_key = dict(zip(index.keys, index.meta))
+    print(f"\n🔁 Групп похожих задач: {len(groups)} (порог сходства {index.threshold})")
+    for n, (members, similarity) in enumerate(groups, 1):
+        topics = {meta_by_key[key]["topic"] for key in members}
+        cross = " — разные темы" if len(topics) > 1 else ""
+        print(f"\n{n}. Сходство до {similarity:.2f}{cross}")
+        for key in members:
+            meta = meta_by_key[key]
+            statement = " ".join((meta["statement_md"] or "").split())
+            print(f"   {meta['code'] or key} [{topic_titles.get(meta['topic'], meta['topic'])}] "
+                  f"{statement[:80]}{'…' if len(statement) > 80 else ''}")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description="Отчёт о почти одинаковых задачах во всей коллекции tasks (MinHash/LSH)"
+    )
+    arg_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                            help=f"минимальное сходство Жаккара по шинглам (по умолчанию {DEFAULT_THRESHOLD})")
+    arg_parser.add_argument("--mirror", action="store_true",
+                            help="читать задачи из локального зеркала (pb_mirror.py), досинхронизировав его")
+    arg_parser.add_argument("--jsonl", help="записать пары в JSONL ('-' — стандартный вывод)")
+    args = arg_parser.parse_args()
+
+    client = PocketBaseClient()
+    client.login()
+    # Человекочитаемый вывод уходит в stderr, если stdout занят под JSONL
+    with redirect_stdout(sys.stderr if args.jsonl == "-" else sys.stdout):
+        mirror = open_synced(client) if args.mirror else None
+        index = NearDuplicateIndex.load(client, mirror=mirror, threshold=args.threshold)
+        print(f"✓ Задач в индексе: {len(index)}")
+        pairs = list(index.pairs())
+        topic_titles = {topic["id"]: topic.get("title", "") for topic in client.topics.iter_all(fields="id,title")}
+        print_report(index, group_pairs(pairs), topic_titles)
+
+    if args.jsonl:
+        meta_by_key = dict(zip(index.keys, index.meta))
+        write_jsonl(({"first": meta_by_key[a]["code"] or a, "second": meta_by_key[b]["code"] or b,
+                      "similarity": round(similarity, 3)} for a, b, similarity in pairs), args.jsonl)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,491 +1,393 @@
 import re
 import os
 import sys
-import yaml
-import requests
+import glob
+import argparse
 from collections import OrderedDict
+from contextlib import redirect_stdout
+from concurrent.futures import ProcessPoolExecutor
+from pb_client import PocketBaseClient
+from pb_manifest import content_hash
+from md_tasks import iter_tasks, parse_tags, read_front_matter
+from dry_run import PhaseTimer, write_jsonl
 
 # --------------------------
 # Настройки
 # --------------------------
-PB_URL = "http://127.0.0.1:8090"
-ADMIN_EMAIL = "oleg.faust@gmail.com"
-ADMIN_PASSWORD = "Zasadazxasqw12#"
 COLLECTION_NAME = "tasks"
 IMAGES_FOLDER = "./images"
 SOURCE_FOLDER = "source"
 
-# Получаем имя файла из аргументов командной строки
-if len(sys.argv) < 2:
-    print("❌ Использование: python3 pb_parser.py <имя_файла>")
-    print("   Пример: python3 pb_parser.py 14.md")
-    print("   Пример: python3 pb_parser.py 16-1")
-    sys.exit(1)
-
-filename = sys.argv[1]
-# Добавляем .md если не указано
-if not filename.endswith('.md'):
-    filename = f"{filename}.md"
-
-MD_FILE = os.path.join(SOURCE_FOLDER, filename)
-
-# Проверяем существование файла
-if not os.path.exists(MD_FILE):
-    print(f"❌ Файл не найден: {MD_FILE}")
-    print(f"\n📁 Доступные файлы в папке {SOURCE_FOLDER}:")
-    if os.path.exists(SOURCE_FOLDER):
-        for f in sorted(os.listdir(SOURCE_FOLDER)):
-            if f.endswith('.md'):
-                print(f"   - {f}")
-    sys.exit(1)
 
 # --------------------------
-# 1. Авторизация
+# 1. Поиск файлов
 # --------------------------
-def admin_login():
-    resp = requests.post(
-        f"{PB_URL}/api/collections/_superusers/auth-with-password",
-        json={"identity": ADMIN_EMAIL, "password": ADMIN_PASSWORD}
-    )
-    resp.raise_for_status()
-    return resp.json()["token"]
+def resolve_md_files(names, use_all: bool = False):
+    """
+    Превращает аргументы командной строки в список путей к .md файлам.
+    Поддерживаются: имя в папке source (14, 16-1.md), путь (source/14.md)
+    и шаблон (source/*.md).
+    """
+    if use_all:
+        return sorted(glob.glob(os.path.join(SOURCE_FOLDER, "*.md")))
+
+    paths = []
+    missing = []
+    for name in names:
+        if glob.has_magic(name):
+            paths.extend(sorted(glob.glob(name)))
+            continue
+        if os.path.isfile(name):
+            paths.append(name)
+            continue
+        # Добавляем .md если не указано
+        if not name.endswith('.md'):
+            name = f"{name}.md"
+        md_file = os.path.join(SOURCE_FOLDER, name)
+        if os.path.isfile(md_file):
+            paths.append(md_file)
+        else:
+            missing.append(md_file)
+
+    if missing:
+        for md_file in missing:
+            print(f"❌ Файл не найден: {md_file}")
+        print(f"\n📁 Доступные файлы в папке {SOURCE_FOLDER}:")
+        if os.path.exists(SOURCE_FOLDER):
+            for f in sorted(os.listdir(SOURCE_FOLDER)):
+                if f.endswith('.md'):
+                    print(f"   - {f}")
+        sys.exit(1)
+
+    # Убираем повторы, сохраняя порядок
+    return list(dict.fromkeys(paths))
 
-TOKEN = admin_login()
-HEADERS = {"Authorization": f"Bearer {TOKEN}"}
-print("✅ Авторизация прошла успешно")
 
 # --------------------------
 # 2. Получаем topic_id по title
 # --------------------------
-def get_topic_id_by_title(title: str):
-    params = {
-        "perPage": 50,
-        "filter": f'title = "{title}"'
-    }
-    resp = requests.get(f"{PB_URL}/api/collections/topics/records", headers=HEADERS, params=params)
-    resp.raise_for_status()
-    items = resp.json().get("items", [])
-    if not items:
+def get_topic_id_by_title(client: PocketBaseClient, title: str):
+    topic = client.topics.by_title(title)
+    if not topic:
         raise ValueError(f"Тема с названием '{title}' не найдена в PB")
-    return items[0]["id"]
+    return topic["id"]
 
-def search_topic_interactive(search_term: str):
+def search_topic_interactive(client: PocketBaseClient, search_term: str):
     """Интерактивный поиск темы"""
     print(f"🔍 Ищу тему: '{search_term}'")
-    
+
     # Сначала точное совпадение
     try:
-        topic_id = get_topic_id_by_title(search_term)
+        topic_id = get_topic_id_by_title(client, search_term)
         print(f"✓ Найдена тема (точное совпадение): {search_term}")
         return topic_id
     except ValueError:
         pass
-    
+
     # Получаем все темы
-    resp = requests.get(
-        f"{PB_URL}/api/collections/topics/records",
-        headers=HEADERS,
-        params={"perPage": 100}
-    )
-    resp.raise_for_status()
-    all_topics = resp.json().get("items", [])
-    
+    all_topics = client.topics.list(per_page=100)
+
     # Поиск по частичному совпадению
     matching_topics = [
-        t for t in all_topics 
+        t for t in all_topics
         if search_term.lower() in t.get("title", "").lower()
     ]
-    
+
     if not matching_topics:
         print(f"❌ Темы содержащие '{search_term}' не найдены")
         print("\n📋 Доступные темы в базе:")
         for i, t in enumerate(all_topics[:20], 1):
             print(f"   {i}. {t.get('title')}")
-        
+
         choice = input("\nВведите номер темы или точное название: ").strip()
         if choice.isdigit():
             idx = int(choice) - 1
             if 0 <= idx < len(all_topics):
                 return all_topics[idx]["id"]
-        return get_topic_id_by_title(choice)
-    
+        return get_topic_id_by_title(client, choice)
+
     if len(matching_topics) == 1:
         print(f"✓ Автоматически выбрана: {matching_topics[0]['title']}")
         return matching_topics[0]["id"]
-    
+
     print(f"\n📋 Найдено {len(matching_topics)} подходящих тем:")
     for i, t in enumerate(matching_topics, 1):
         print(f"   {i}. {t.get('title')}")
-    
+
     choice = int(input("\nВыберите номер темы: ")) - 1
     if 0 <= choice < len(matching_topics):
         selected = matching_topics[choice]
         print(f"✓ Выбрана тема: {selected['title']}")
         return selected["id"]
-    
+
     raise ValueError("Неверный выбор")
 
 # --------------------------
 # 3. Работа с тегами
 # --------------------------
-def get_or_create_tag(tag_title: str):
-    """
-    Получает или создает тег по названию (title).
-    Возвращает ID тега или None в случае ошибки.
-    """
-    tag_title = tag_title.strip()
-    if not tag_title:
-        return None
-    
-    try:
-        # Ищем существующий тег по title
-        resp = requests.get(
-            f"{PB_URL}/api/collections/tags/records",
-            headers=HEADERS,
-            params={"filter": f'title = "{tag_title}"', "perPage": 1}
-        )
-        resp.raise_for_status()
-        items = resp.json().get("items", [])
-        
-        if items:
-            return items[0]["id"]
-        
-        # Создаем новый тег
-        import random
-        colors = ["#FF6B6B", "#4ECDC4", "#45B7D1", "#FFA07A", "#98D8C8", 
-                  "#F7DC6F", "#BB8FCE", "#85C1E2", "#F8B500", "#52BE80"]
-        
-        create_resp = requests.post(
-            f"{PB_URL}/api/collections/tags/records",
-            headers=HEADERS,
-            json={
-                "title": tag_title,
-                "color": random.choice(colors)
-            }
-        )
-        
-        if create_resp.status_code == 200:
-            tag_id = create_resp.json()["id"]
-            print(f"   ✓ Создан новый тег: {tag_title}")
-            return tag_id
-        else:
-            print(f"   ⚠️ Не удалось создать тег '{tag_title}': {create_resp.text}")
-            return None
-            
-    except Exception as e:
-        print(f"   ⚠️ Ошибка при работе с тегом '{tag_title}': {e}")
-        return None
-
-def parse_tags(tags_input):
-    """
-    Парсит теги из строки или списка.
-    Поддерживает форматы:
-    - "Логарифм" -> ["Логарифм"]
-    - "[База, Логарифм, Вычисления]" -> ["База", "Логарифм", "Вычисления"]
-    - "База, Логарифм" -> ["База", "Логарифм"]
-    """
-    if not tags_input:
-        return []
-    
-    # Если это список
-    if isinstance(tags_input, list):
-        return [str(t).strip() for t in tags_input if str(t).strip()]
-    
-    # Если это строка
-    if isinstance(tags_input, str):
-        tags_input = tags_input.strip()
-        
-        # Убираем квадратные скобки если есть
-        if tags_input.startswith('[') and tags_input.endswith(']'):
-            tags_input = tags_input[1:-1]
-        
-        # Разделяем по запятой
-        tag_list = [t.strip() for t in tags_input.split(",") if t.strip()]
-        return tag_list
-    
-    return []
-
-def get_or_create_tags(tags_input):
-    """
-    Получает или создает теги.
-    Возвращает список ID тегов.
-    """
-    tag_list = parse_tags(tags_input)
-    if not tag_list:
-        return []
-    
-    tag_ids = []
-    for tag_title in tag_list:
-        tag_id = get_or_create_tag(tag_title)
-        if tag_id:
-            tag_ids.append(tag_id)
-    
-    return tag_ids
+# При загрузке (pb_ingest.IngestEngine) все теги читаются один раз в индекс
+# (pb_tags.TagIndex), дальше поиск идёт по словарю без запросов к серверу.
+# Строки тегов разбирает md_tasks.parse_tags.
 
 # --------------------------
 # 4. Генерация кода задачи
 # --------------------------
-def generate_code(topic_id: str):
-    topic_resp = requests.get(f"{PB_URL}/api/collections/topics/records/{topic_id}", headers=HEADERS)
-    topic_resp.raise_for_status()
-    topic = topic_resp.json()
-    ege_number = topic.get("ege_number")
-    if not ege_number:
-        raise ValueError("У темы не указан ege_number")
-
-    tasks_resp = requests.get(
-        f"{PB_URL}/api/collections/tasks/records",
-        headers=HEADERS,
-        params={"filter": f'topic = "{topic_id}"', "fields": "code", "perPage": 500}
-    )
-    tasks_resp.raise_for_status()
-    counters = []
-    for t in tasks_resp.json().get("items", []):
-        code = t.get("code")
-        if code and "-" in code:
-            try:
-                _, num = code.split("-")
-                counters.append(int(num))
-            except:
-                continue
-    next_num = max(counters, default=0) + 1
-    return f"{ege_number}-{str(next_num).zfill(3)}"
+# Коды выдаёт CodeAllocator из generate_task_code (через pb_ingest.TopicState): номера резервируются
+# в общем хранилище (.code_reservations.sqlite3), максимум темы читается
+# с сервера не чаще раза в минуту, а не заново для каждой задачи.
 
 # --------------------------
 # 5. ПАРСИНГ MD С YAML
 # --------------------------
-print(f"\n📄 Читаю файл: {MD_FILE}")
-with open(MD_FILE, "r", encoding="utf-8") as f:
-    md_text = f.read()
-
-# Парсим YAML-блок
-yaml_block = re.search(r"^---\s*\n(.*?)\n---", md_text, re.DOTALL | re.MULTILINE)
-
-if not yaml_block:
-    print("❌ YAML-блок не найден!")
-    exit(1)
-
-# Парсим YAML
-yaml_content = yaml_block.group(1)
-metadata = yaml.safe_load(yaml_content)
-
-print("\n📊 Метаданные из YAML:")
-for key, value in metadata.items():
-    print(f"   {key}: {value}")
-
-# Извлекаем поля из YAML
-topic_name = metadata.get("topic")
-subtopic_name = metadata.get("subtopic")  # Парсим подтему из YAML
-difficulty = str(metadata.get("difficulty", "1"))
-source = metadata.get("source", "Не указан")
-year = metadata.get("year", 2026)
-global_tags_str = metadata.get("tags", "")
-
-# Если subtopic не указана в YAML, пытаемся определить из имени файла
-# Например: 16-1.md -> subtopic = "1", 16-2.md -> subtopic = "2"
-if not subtopic_name:
-    filename_match = re.match(r"(\d+)-(\d+)\.md$", filename)
-    if filename_match:
-        subtopic_name = filename_match.group(2)
-        print(f"ℹ️  Подтема определена из имени файла: {subtopic_name}")
-
-# Проверяем обязательные поля
-if not topic_name:
-    print("❌ Поле 'topic' обязательно!")
-    exit(1)
-
-# Получаем ID глобальных тегов (из YAML)
-print("\n🏷️  Обработка глобальных тегов из YAML...")
-global_tag_ids = get_or_create_tags(global_tags_str)
-if global_tag_ids:
-    print(f"✓ Найдено/создано глобальных тегов: {len(global_tag_ids)}")
-else:
-    print("✓ Глобальные теги не используются")
-
-# Интерактивный поиск темы
-TOPIC_ID = search_topic_interactive(topic_name)
-
-# Обновляем subtopic в topics если она указана
-if subtopic_name:
-    try:
-        update_resp = requests.patch(
-            f"{PB_URL}/api/collections/topics/records/{TOPIC_ID}",
-            headers=HEADERS,
-            json={"subtopic": subtopic_name}
-        )
-        if update_resp.status_code == 200:
-            print(f"✓ Подтема '{subtopic_name}' установлена для темы")
-        else:
-            print(f"⚠️ Не удалось обновить подтему: {update_resp.text}")
-    except Exception as e:
-        print(f"⚠️ Ошибка при обновлении подтемы: {e}")
-
-# --------------------------
-# 6. ПАРСИНГ ЗАДАНИЙ
-# --------------------------
-print(f"\n📝 Парсинг заданий...")
-
-# Убираем YAML блок и заголовки
-content = re.sub(r"^---\s*\n.*?\n---\s*\n", "", md_text, flags=re.DOTALL | re.MULTILINE)
-content = re.sub(r"^#.*$", "", content, flags=re.MULTILINE)
-content = re.sub(r"^###.*$", "", content, flags=re.MULTILINE)
-
-# Разбиваем текст на строки
-lines = content.split('\n')
-
-tasks = OrderedDict()
-current_task = None
-current_task_num = None
-current_statement = []
-in_statement = False
+def parse_file(md_file: str) -> dict:
+    """
+    Разбирает один .md файл без обращений к серверу.
+    Возвращает метаданные и задания; теги пока хранятся названиями.
+    """
+    filename = os.path.basename(md_file)
+    with open(md_file, "r", encoding="utf-8") as f:
+        md_text = f.read()
+
+    # Парсим YAML-блок
+    metadata = read_front_matter(md_text)
+    if metadata is None:
+        raise ValueError("YAML-блок не найден!")
+
+    # Извлекаем поля из YAML
+    topic_name = metadata.get("topic")
+    subtopic_name = metadata.get("subtopic")  # Парсим подтему из YAML
+
+    # Если subtopic не указана в YAML, пытаемся определить из имени файла
+    # Например: 16-1.md -> subtopic = "1", 16-2.md -> subtopic = "2"
+    if not subtopic_name:
+        filename_match = re.match(r"(\d+)-(\d+)\.md$", filename)
+        if filename_match:
+            subtopic_name = filename_match.group(2)
+
+    # Проверяем обязательные поля
+    if not topic_name:
+        raise ValueError("Поле 'topic' обязательно!")
+
+    # --------------------------
+    # 6. ПАРСИНГ ЗАДАНИЙ
+    # --------------------------
+    # Один проход токенизатором md_tasks; ID тегов назначаются позже,
+    # когда известны теги всех файлов
+    tasks = OrderedDict()
+    duplicate_numbers = []
+    for task in iter_tasks(md_text.split("\n")):
+        task["tags"] = []
+        num = task.pop("number")
+        if num in tasks:
+            duplicate_numbers.append(num)
+        tasks[num] = task
+
+    return {
+        "path": md_file,
+        "filename": filename,
+        "metadata": metadata,
+        "topic": topic_name,
+        "subtopic": subtopic_name,
+        "difficulty": str(metadata.get("difficulty", "1")),
+        "source": metadata.get("source", "Не указан"),
+        "year": metadata.get("year", 2026),
+        "global_tags": parse_tags(metadata.get("tags", "")),
+        "tasks": tasks,
+        "duplicate_numbers": duplicate_numbers,
+    }
 
-for line in lines:
-    line = line.strip()
-    
-    # Пропускаем пустые строки если не собираем условие
-    if not line and not in_statement:
-        continue
-    
-    # Начало нового задания: **номер** [сложность]
-    match = re.match(r'^\*\*(\d+)\*\*\s+\[(\d+)\]\s+(.*)$', line)
-    if match:
-        # Сохраняем предыдущее задание если есть
-        if current_task_num and current_statement:
-            tasks[current_task_num]["statement_md"] = "\n".join(current_statement).strip()
-        
-        # Начинаем новое задание
-        current_task_num = int(match.group(1))
-        task_difficulty = match.group(2)
-        first_line = match.group(3).strip()
-        
-        current_task = {
-            "difficulty": task_difficulty,
-            "answer": "",
-            "tags": []
-        }
-        tasks[current_task_num] = current_task
-        
-        current_statement = [first_line] if first_line else []
-        in_statement = True
-        continue
-    
-    # Строка с ответом
-    if line.startswith("ответ:"):
-        if current_task:
-            current_task["answer"] = line.replace("ответ:", "").strip()
-            in_statement = False
-        continue
-    
-    # Строка с тегами задачи
-    if line.startswith("tags:"):
-        if current_task:
-            task_tags_str = line.replace("tags:", "").strip()
-            task_tag_ids = get_or_create_tags(task_tags_str)
-            # Объединяем глобальные теги и теги задачи
-            current_task["tags"] = list(set(global_tag_ids + task_tag_ids))
-        continue
-    
-    # Собираем строки условия
-    if in_statement and line:
-        current_statement.append(line)
 
-# Сохраняем последнее задание
-if current_task_num and current_statement:
-    tasks[current_task_num]["statement_md"] = "\n".join(current_statement).strip()
+def parse_file_safe(md_file: str):
+    """Обёртка для пула процессов: ошибка возвращается, а не пробрасывается"""
+    try:
+        return parse_file(md_file), None
+    except Exception as e:
+        return None, str(e)
+
+
+def parse_files(md_files, workers: int = None):
+    """Разбирает файлы параллельно в пуле процессов (один файл — в текущем процессе)"""
+    if len(md_files) == 1:
+        return [parse_file_safe(md_files[0])]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(parse_file_safe, md_files))
+
+
+def print_parsed(parsed: dict):
+    print(f"\n📄 Файл: {parsed['path']}")
+    print("📊 Метаданные из YAML:")
+    for key, value in parsed["metadata"].items():
+        print(f"   {key}: {value}")
+    if parsed["subtopic"] and not parsed["metadata"].get("subtopic"):
+        print(f"ℹ️  Подтема определена из имени файла: {parsed['subtopic']}")
+
+    print(f"✓ Найдено заданий: {len(parsed['tasks'])}")
+
+    # Выводим информацию о каждом задании
+    for num, task in parsed["tasks"].items():
+        statement_preview = task["statement_md"][:50] + "..." if len(task["statement_md"]) > 50 else task["statement_md"]
+        tags_count = len(task["tag_titles"] or [])
+        print(f"   Задание {num}: сложность={task['difficulty']}, ответ='{task['answer']}', теги={tags_count}, текст='{statement_preview}'")
+
+
+def validate_parsed(parsed: dict):
+    """Проблемы разобранного файла: список (уровень, номер задания, сообщение)"""
+    problems = []
+    for num in parsed["duplicate_numbers"]:
+        problems.append(("warning", num, "номер повторяется, остаётся последнее задание"))
+    for num, task in parsed["tasks"].items():
+        if not task["statement_md"]:
+            problems.append(("error", num, "пустое условие"))
+        if not task["answer"]:
+            problems.append(("warning", num, "нет ответа"))
+        if not str(task["difficulty"]).isdigit():
+            problems.append(("error", num, f"сложность '{task['difficulty']}' не число"))
+    return problems
+
+
+def base_record(parsed: dict, task: dict) -> dict:
+    """Поля записи задачи, известные без сервера (без темы, тегов и кода)"""
+    # Все поля из PocketBase schema
+    return {
+        "difficulty": task.get("difficulty", parsed["difficulty"]),
+        "statement_md": task["statement_md"],
+        "answer": task.get("answer", ""),
+        "solution_md": "",
+        "explanation_md": "",
+        "source": parsed["source"],
+        "year": parsed["year"],
+        "has_image": False,
+    }
 
-print(f"\n✓ Найдено заданий: {len(tasks)}")
 
-# Выводим информацию о каждом задании
-for num, task in tasks.items():
-    statement_preview = task["statement_md"][:50] + "..." if len(task["statement_md"]) > 50 else task["statement_md"]
-    print(f"   Задание {num}: сложность={task['difficulty']}, ответ='{task['answer']}', теги={len(task['tags'])}, текст='{statement_preview}'")
+def task_fingerprint(parsed: dict, task: dict) -> str:
+    """Хеш всего, что попадает в запись задачи: по нему видно, менялась ли она"""
+    return content_hash({
+        "statement_md": task["statement_md"],
+        "answer": task["answer"],
+        "difficulty": task["difficulty"],
+        "tags": task.get("tag_titles"),
+        "global_tags": parsed["global_tags"],
+        "topic": parsed["topic"],
+        "source": parsed["source"],
+        "year": parsed["year"],
+    })
 
-if len(tasks) == 0:
-    print("❌ Задания не найдены!")
-    exit(1)
 
 # --------------------------
-# 7. Проверяем дубли
+# 7. Режим проверки без сервера
 # --------------------------
-print(f"\n🔍 Проверяю дубликаты в базе...")
-existing_statements = set()
-existing_tasks_resp = requests.get(
-    f"{PB_URL}/api/collections/tasks/records",
-    headers=HEADERS,
-    params={"perPage": 500, "filter": f'topic = "{TOPIC_ID}"', "fields": "statement_md"}
-)
-existing_tasks_resp.raise_for_status()
-
-for t in existing_tasks_resp.json().get("items", []):
-    existing_statements.add(t.get("statement_md", "").strip())
+def dry_run(md_files, workers, jsonl_path: str = "-"):
+    """
+    Разбирает и проверяет файлы, выводит будущие записи в JSONL.
+    К серверу не обращается; вместо ID темы и тегов — их названия, код не назначается.
+    Возвращает число ошибок проверки.
+    """
+    timer = PhaseTimer()
+    file_errors = 0
+    problems_by_file = []
+    # Человекочитаемый вывод уходит в stderr, stdout остаётся под JSONL
+    with redirect_stdout(sys.stderr):
+        print(f"\n📝 Парсинг файлов: {len(md_files)}")
+        with timer.phase("разбор"):
+            results = parse_files(md_files, workers)
+
+        parsed_files = []
+        for md_file, (parsed, error) in zip(md_files, results):
+            if error is None and not parsed["tasks"]:
+                error = "Задания не найдены!"
+            if error:
+                print(f"\n❌ {md_file}: {error}")
+                file_errors += 1
+                continue
+            print_parsed(parsed)
+            parsed_files.append(parsed)
+
+        with timer.phase("проверка"):
+            for parsed in parsed_files:
+                problems_by_file.append((parsed, validate_parsed(parsed)))
+
+        for parsed, problems in problems_by_file:
+            for level, num, message in problems:
+                icon = "❌" if level == "error" else "⚠️ "
+                print(f"{icon} {parsed['filename']}: задание {num}: {message}")
+
+    def records():
+        for parsed in parsed_files:
+            for num, task in parsed["tasks"].items():
+                tag_titles = None
+                if task["tag_titles"] is not None:
+                    # Как при загрузке: глобальные теги добавляются к задачам со строкой tags:
+                    tag_titles = list(dict.fromkeys(parsed["global_tags"] + task["tag_titles"]))
+                record = {"file": parsed["filename"], "number": num, "code": None,
+                          "topic": parsed["topic"]}
+                record.update(base_record(parsed, task))
+                if tag_titles:
+                    record["tags"] = tag_titles
+                yield record
+
+    with timer.phase("вывод JSONL"):
+        count = write_jsonl(records(), jsonl_path)
+
+    errors = file_errors + sum(1 for _, problems in problems_by_file
+                               for level, _, _ in problems if level == "error")
+    warnings = sum(1 for _, problems in problems_by_file
+                   for level, _, _ in problems if level == "warning")
+    print(f"\n🧪 Проверка без сервера: записей {count}, ошибок {errors}, "
+          f"предупреждений {warnings}", file=sys.stderr)
+    timer.report()
+    return errors
 
-print(f"✓ Существующих задач в базе: {len(existing_statements)}")
 
 # --------------------------
 # 8. Загружаем в PB
 # --------------------------
-print(f"\n📤 Начинаю загрузку задач...")
-print("="*60)
+def main():
+    # Загрузка идёт через общий движок pb_ingest (он сам импортирует этот модуль)
+    from pb_ingest import add_ingest_arguments, run_ingest
+
+    arg_parser = argparse.ArgumentParser(
+        description="Загрузка задач из Markdown в PocketBase",
+        epilog="Примеры: python3 pb_parser.py 14.md | python3 pb_parser.py 16-1 --batch-size 100 | "
+               "python3 pb_parser.py source/*.md | python3 pb_parser.py --all"
+    )
+    arg_parser.add_argument(
+        "files", nargs="*",
+        help="имена файлов в папке source (расширение .md можно не указывать), пути или шаблоны"
+    )
+    arg_parser.add_argument("--all", action="store_true", help=f"загрузить все .md файлы из папки {SOURCE_FOLDER}")
+    arg_parser.add_argument(
+        "--workers", type=int, default=None,
+        help="сколько процессов использовать для парсинга нескольких файлов (по умолчанию — по числу ядер)"
+    )
+    add_ingest_arguments(arg_parser)
+    arg_parser.add_argument(
+        "--dry-run", action="store_true",
+        help="только разобрать и проверить файлы, не обращаясь к серверу и не трогая манифест; "
+             "записи выводятся в JSONL"
+    )
+    arg_parser.add_argument(
+        "--jsonl", default="-",
+        help="куда писать записи в режиме --dry-run (по умолчанию '-' — стандартный вывод)"
+    )
+    args = arg_parser.parse_args()
 
-added_count = 0
-skipped_count = 0
-error_count = 0
+    if not args.files and not args.all:
+        arg_parser.error("укажите файл(ы) или --all")
 
-for num, task in tasks.items():
-    statement = task["statement_md"]
-    
-    if statement in existing_statements:
-        print(f"⚠️  Задание {num}: пропущено (дубликат)")
-        skipped_count += 1
-        continue
+    md_files = resolve_md_files(args.files, use_all=args.all)
+    if not md_files:
+        print(f"❌ Не найдено ни одного .md файла")
+        sys.exit(1)
 
-    code = generate_code(TOPIC_ID)
-    
-    # Все поля из PocketBase schema
-    record_data = {
-        "code": code,
-        "topic": TOPIC_ID,
-        "difficulty": task.get("difficulty", difficulty),
-        "statement_md": statement,
-        "answer": task.get("answer", ""),
-        "solution_md": "",
-        "explanation_md": "",
-        "source": source,
-        "year": year,
-        "has_image": False,
-    }
-    
-    # Добавляем теги
-    task_tags = task.get("tags", [])
-    if task_tags:
-        record_data["tags"] = task_tags
+    if args.dry_run:
+        sys.exit(1 if dry_run(md_files, args.workers, args.jsonl) else 0)
 
-    try:
-        r = requests.post(
-            f"{PB_URL}/api/collections/{COLLECTION_NAME}/records",
-            headers=HEADERS,
-            data=record_data
-        )
-
-        if r.status_code == 200:
-            tags_info = f" (теги: {len(task_tags)})" if task_tags else ""
-            print(f"✅ Задание {num}: добавлено с кодом {code}{tags_info}")
-            added_count += 1
-        else:
-            print(f"❌ Задание {num}: ошибка {r.status_code}")
-            print(f"   Ответ: {r.text}")
-            error_count += 1
-    except Exception as e:
-        print(f"❌ Задание {num}: исключение - {e}")
-        error_count += 1
-
-print("\n" + "="*60)
-print(f"📊 ИТОГОВАЯ СТАТИСТИКА:")
-print(f"   ✅ Добавлено: {added_count}")
-print(f"   ⚠️  Пропущено (дубликаты): {skipped_count}")
-print(f"   ❌ Ошибки: {error_count}")
-print(f"   📝 Всего обработано: {len(tasks)}")
-print("="*60)
+    sys.exit(0 if run_ingest(md_files, args, format_name="bold", workers=args.workers) else 1)
+
+
+if __name__ == "__main__":
+    main()
 
 
 # import re
@@ -0,0 +1,75 @@
+import random
+
+from pb_upload import BatchUploader
+
+# --------------------------
+# Индекс тегов в памяти
+# --------------------------
+# Коллекция tags читается один раз при старте. Дальше теги ищутся
+# по словарю без учёта регистра, а недостающие создаются одним проходом.
+
+TAG_COLORS = ["#FF6B6B", "#4ECDC4", "#45B7D1", "#FFA07A", "#98D8C8",
+              "#F7DC6F", "#BB8FCE", "#85C1E2", "#F8B500", "#52BE80"]
+
+
+def normalize_tag(title: str) -> str:
+    """Ключ тега: без лишних пробелов и без учёта регистра"""
+    return " ".join(str(title).split()).casefold()
+
+
+class TagIndex:
+    """Словарь 'нормализованное название -> ID тега'"""
+
+    def __init__(self, client):
+        self.client = client
+        self.ids_by_key = {}
+
+    @classmethod
+    def load(cls, client, mirror=None):
+        """Все теги с сервера или из локального зеркала (pb_mirror), если оно передано"""
+        index = cls(client)
+        if mirror is not None:
+            tags = mirror.tags()
+        else:
+            tags = ((tag["id"], tag.get("title", "")) for tag in client.tags.iter_all(fields="id,title"))
+        for tag_id, title in tags:
+            index.ids_by_key.setdefault(normalize_tag(title), tag_id)
+        return index
+
+    def __len__(self):
+        return len(self.ids_by_key)
+
+    def get(self, title: str):
+        return self.ids_by_key.get(normalize_tag(title))
+
+    def ensure(self, titles):
+        """Создаёт все недостающие теги за один проход"""
+        missing = {}
+        for title in titles:
+            title = str(title).strip()
+            key = normalize_tag(title)
+            if key and key not in self.ids_by_key and key not in missing:
+                missing[key] = title
+        if not missing:
+            return
+
+        uploader = BatchUploader(self.client, "tags")
+        items = [(key, {"title": title, "color": random.choice(TAG_COLORS)})
+                 for key, title in missing.items()]
+        for key, record, ok, detail in uploader.upload(items):
+            if ok:
+                self.ids_by_key[key] = detail["id"]
+                print(f"   ✓ Создан новый тег: {record['title']}")
+            else:
+                print(f"   ⚠️ Не удалось создать тег '{record['title']}': {detail}")
+
+    def ids(self, titles) -> list:
+        """ID тегов по списку названий (недостающие теги создаются)"""
+        titles = [t for t in titles if str(t).strip()]
+        self.ensure(titles)
+        tag_ids = []
+        for title in titles:
+            tag_id = self.get(title)
+            if tag_id and tag_id not in tag_ids:
+                tag_ids.append(tag_id)
+        return tag_ids
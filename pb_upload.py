@@ -0,0 +1,147 @@
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# --------------------------
+# Пакетная загрузка записей в PocketBase
+# --------------------------
+# Записи группируются по batch_size штук и отправляются одним запросом
+# POST /api/batch. Если пакетные запросы на сервере выключены (или сервер
+# их не знает), загрузчик переходит на обычные POST по одной записи.
+# При concurrency > 1 пакеты отправляются параллельно из пула потоков,
+# но результаты отдаются в исходном порядке.
+
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_CONCURRENCY = 1
+
+# Статусы, по которым считаем, что /api/batch недоступен
+BATCH_UNAVAILABLE_STATUSES = (403, 404, 405)
+
+
+def is_batch_too_large(response) -> bool:
+    """400 от /api/batch из-за числа запросов в пакете, а не из-за ошибки в записи"""
+    try:
+        error = response.json().get("data", {}).get("requests", {})
+    except ValueError:
+        return False
+    return isinstance(error, dict) and error.get("code") == "validation_length_too_long"
+
+
+class BatchUploader:
+    """
+    Загружает записи в коллекцию пакетами.
+    upload() отдаёт результат по каждой записи: (key, record, ok, detail),
+    где detail — сохранённая запись при успехе или текст ошибки.
+    concurrency — сколько пакетов могут быть в пути одновременно.
+    """
+
+    def __init__(self, client, collection: str, batch_size: int = DEFAULT_BATCH_SIZE,
+                 concurrency: int = DEFAULT_CONCURRENCY):
+        self.client = client
+        self.collection = client.collection(collection)
+        self.batch_size = max(1, batch_size)
+        self.batch_enabled = self.batch_size > 1
+        self.concurrency = max(1, concurrency)
+        # Ограничиваем очередь: не больше двух пакетов на поток
+        self.max_in_flight = self.concurrency * 2
+        self._lock = threading.Lock()
+
+    def upload(self, items):
+        """
+        items — итерируемое пар (key, record) для создания записей
+        или троек (key, record, record_id) для обновления существующих
+        """
+        if self.concurrency == 1:
+            for chunk in self._chunks(items):
+                yield from self._upload_chunk(chunk)
+            return
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            in_flight = deque()
+            for chunk in self._chunks(items):
+                if len(in_flight) >= self.max_in_flight:
+                    yield from in_flight.popleft().result()
+                in_flight.append(pool.submit(lambda c=chunk: list(self._upload_chunk(c))))
+            while in_flight:
+                yield from in_flight.popleft().result()
+
+    def _chunks(self, items):
+        chunk = []
+        for item in items:
+            if len(item) == 2:
+                item = (*item, None)
+            chunk.append(item)
+            if len(chunk) >= self.batch_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def _upload_chunk(self, chunk):
+        if self.batch_enabled and len(chunk) > 1:
+            results = self._post_batch(chunk)
+            if results is not None:
+                yield from results
+                return
+        for key, record, record_id in chunk:
+            ok, detail = self._post_single(record, record_id)
+            yield key, record, ok, detail
+
+    def _post_single(self, record: dict, record_id: str = None):
+        try:
+            if record_id:
+                r = self.collection.update(record_id, record)
+            else:
+                r = self.collection.create(record)
+        except Exception as e:
+            return False, f"исключение - {e}"
+        if r.status_code == 200:
+            return True, r.json()
+        return False, f"ошибка {r.status_code}: {r.text}"
+
+    def _post_batch(self, chunk):
+        """
+        Отправляет пакет. Возвращает список результатов или None,
+        если пакет нужно догрузить по одной записи.
+        """
+        try:
+            r = self.client.batch([
+                {"method": "PATCH", "url": f"{self.collection.path}/{record_id}", "body": record}
+                if record_id else
+                {"method": "POST", "url": self.collection.path, "body": record}
+                for _, record, record_id in chunk
+            ])
+        except Exception as e:
+            print(f"   ⚠️ Пакетный запрос не удался ({e}), загружаю по одной записи")
+            return None
+
+        if r.status_code in BATCH_UNAVAILABLE_STATUSES:
+            with self._lock:
+                if self.batch_enabled:
+                    print("   ⚠️ Пакетные запросы отключены на сервере, перехожу на загрузку по одной записи")
+                    self.batch_enabled = False
+            return None
+
+        if r.status_code == 400 and is_batch_too_large(r) and len(chunk) > 1:
+            # Пакет больше лимита batch.maxRequests на сервере: дальше шлём пакеты вдвое меньше
+            half = len(chunk) // 2
+            with self._lock:
+                if self.batch_size > half:
+                    print(f"   ⚠️ Сервер не принял пакет из {len(chunk)} записей, уменьшаю пакет до {half}")
+                    self.batch_size = half
+            return list(self._upload_chunk(chunk[:half])) + list(self._upload_chunk(chunk[half:]))
+
+        if r.status_code != 200:
+            # Пакет выполняется в одной транзакции: при ошибке любой записи
+            # не сохраняется ничего, поэтому догружаем по одной и узнаём,
+            # какая именно запись не прошла.
+            return None
+
+        results = []
+        for (key, record, _), resp in zip(chunk, r.json()):
+            status = resp.get("status")
+            if status == 200:
+                results.append((key, record, True, resp.get("body", {})))
+            else:
+                results.append((key, record, False, f"ошибка {status}: {resp.get('body')}"))
+        return results
@@ -1,37 +1,113 @@
 import os
 import re
+import copy
+import pickle
 import random
+import sqlite3
+import hashlib
+import zipfile
 import argparse
+import json
+
+try:
+    import numpy as np
+except ImportError:     # без NumPy работает выборка через random
+    np = None
+
+# pb_upload не тянет requests: настройки пакетов берутся из него и без PocketBase
+from pb_upload import DEFAULT_BATCH_SIZE, DEFAULT_CONCURRENCY
 
 
 COUNTER_DIR = 'counters'
+COUNTER_DB = os.path.join(COUNTER_DIR, 'counters.sqlite3')
 CARDS_DIR = 'cards'
 ANSWERS_DIR = 'answers'
+BUNDLE_DIR = 'bundles'
+MIX_COUNTER = 'mix'
+PARSE_CACHE_DIR = '.parse_cache'
+PARSE_CACHE_VERSION = 1
+
+TASK_LINE = re.compile(r'^(\d+)\.\s*(.+)$')
 
 
 # =========================
 # Счётчик карточек
 # =========================
 
-def get_next_card_numbers(file_num, count):
-    """Получает следующие номера карточек для конкретного файла задания"""
-    os.makedirs(COUNTER_DIR, exist_ok=True)
-    counter_file = os.path.join(COUNTER_DIR, f'card_counter_{file_num}.txt')
+# Все счётчики лежат в одной базе SQLite (режим WAL). Диапазон номеров
+# резервируется одной транзакцией BEGIN IMMEDIATE, поэтому параллельные
+# запуски генератора никогда не получат одинаковые номера. Старые
+# counters/card_counter_N.txt импортируются при первом обращении к счётчику
+# и дальше обновляются как копия — по ним видно текущее значение.
+
+def counter_txt_path(name):
+    return os.path.join(COUNTER_DIR, f'card_counter_{name}.txt')
+
+
+def read_counter_txt(name):
+    path = counter_txt_path(name)
+    if not os.path.exists(path):
+        return 0
+    with open(path, 'r') as f:
+        value = f.read().strip()
+    return int(value) if value else 0
+
+
+def open_counter_db(path=COUNTER_DB):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+    return conn
 
-    if os.path.exists(counter_file):
-        with open(counter_file, 'r') as f:
-            current = int(f.read().strip())
-    else:
-        current = 0
 
-    numbers = []
-    for i in range(current + 1, current + count + 1):
-        numbers.append(f"{file_num}-{i:03d}")
+def reserve_card_range(name, count, path=COUNTER_DB):
+    """Атомарно резервирует count номеров счётчика name: возвращает первый из них"""
+    conn = open_counter_db(path)
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT value FROM counters WHERE name = ?', (str(name),)).fetchone()
+            current = row[0] if row else read_counter_txt(name)
+            conn.execute('INSERT OR REPLACE INTO counters (name, value) VALUES (?, ?)',
+                         (str(name), current + count))
+            # Копия в txt пишется под той же блокировкой
+            with open(counter_txt_path(name), 'w') as f:
+                f.write(str(current + count))
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+    finally:
+        conn.close()
+    return current + 1
 
-    with open(counter_file, 'w') as f:
-        f.write(str(current + count))
 
-    return numbers
+class CardNumbers:
+    """Номера label-NNN диапазона [first, first + count) без списка строк в памяти"""
+
+    def __init__(self, label, first, count):
+        self.label = label
+        self.numbers = range(first, first + count)
+
+    def __len__(self):
+        return len(self.numbers)
+
+    def __getitem__(self, i):
+        return f"{self.label}-{self.numbers[i]:03d}"
+
+    def __iter__(self):
+        for n in self.numbers:
+            yield f"{self.label}-{n:03d}"
+
+
+def reserve_card_numbers(label, count):
+    return CardNumbers(label, reserve_card_range(label, count), count)
+
+
+def get_next_card_numbers(file_num, count):
+    """Получает следующие номера карточек для конкретного файла задания"""
+    return list(reserve_card_numbers(file_num, count))
 
 
 # =========================
@@ -45,17 +121,15 @@ def parse_md_file(filepath):
     tasks = {}
     answers = {}
 
-    # -------- задания --------
+    # Задания и ответы за один проход: ответы — таблица после строки 'keys'
+    in_keys = False
     for line in lines:
         line = line.strip()
-        m = re.match(r'^(\d+)\.\s*(.+)$', line)
+
+        m = TASK_LINE.match(line)
         if m:
             tasks[int(m.group(1))] = m.group(2)
-
-    # -------- ответы --------
-    in_keys = False
-    for line in lines:
-        line = line.strip()
+            continue
 
         if line.lower() == 'keys':
             in_keys = True
@@ -81,61 +155,476 @@ def parse_md_file(filepath):
 
 
 # =========================
-# Генерация карточек
+# Кэш разобранных файлов
 # =========================
+# Разобранные задания и ответы хранятся в .parse_cache/ в pickle рядом
+# с отпечатком источника: путь, размер и mtime. Если размер и mtime совпали —
+# файл не читается вовсе; если нет — сверяется хеш содержимого, и только
+# изменённый файл разбирается заново.
+
+def file_digest(filepath):
+    with open(filepath, 'rb') as f:
+        return hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+
+
+def parse_cache_path(filepath):
+    name = hashlib.blake2b(os.path.abspath(filepath).encode('utf-8'), digest_size=8).hexdigest()
+    return os.path.join(PARSE_CACHE_DIR, f'{os.path.basename(filepath)}.{name}.pickle')
+
+
+def read_parse_cache(cache_path):
+    try:
+        with open(cache_path, 'rb') as f:
+            entry = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ValueError):
+        return None
+    if not isinstance(entry, dict) or entry.get('version') != PARSE_CACHE_VERSION:
+        return None
+    return entry
+
+
+def write_parse_cache(cache_path, entry):
+    os.makedirs(PARSE_CACHE_DIR, exist_ok=True)
+    # Пишем во временный файл и подменяем — параллельный запуск не прочтёт половину
+    tmp_path = f'{cache_path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, cache_path)
+
+
+def load_md_file(filepath, use_cache=True):
+    """parse_md_file с кэшем на диске; любая правка источника сбрасывает кэш"""
+    if not use_cache:
+        return parse_md_file(filepath)
+
+    st = os.stat(filepath)
+    stamp = (os.path.abspath(filepath), st.st_size, st.st_mtime_ns)
+    cache_path = parse_cache_path(filepath)
+    entry = read_parse_cache(cache_path)
+    if entry is not None and entry['stamp'] == stamp:
+        return entry['tasks'], entry['answers']
+
+    digest = file_digest(filepath)
+    if entry is not None and entry['digest'] == digest:
+        # Файл «тронут», но не изменён — обновляем только отпечаток
+        entry['stamp'] = stamp
+    else:
+        tasks, answers = parse_md_file(filepath)
+        entry = {
+            'version': PARSE_CACHE_VERSION,
+            'stamp': stamp,
+            'digest': digest,
+            'tasks': tasks,
+            'answers': answers
+        }
+    try:
+        write_parse_cache(cache_path, entry)
+    except OSError:
+        pass    # кэш — только ускорение; без права записи работаем без него
+    return entry['tasks'], entry['answers']
+
 
-def generate_cards(file_num, tasks_per_card, cards_count):
-    tasks, answers = parse_md_file(f'source/{file_num}.md')
-    task_numbers = list(tasks.keys())
+# =========================
+# Пакетная выборка заданий
+# =========================
+
+# Сколько случайных чисел генерировать за один шаг (карточки × задания пула)
+SAMPLE_CHUNK = 1 << 22
+
+
+def sample_batch(population_size, per_card, cards_count, seed=None):
+    """
+    Индексы заданий для всех карточек сразу: таблица cards_count × per_card
+    (numpy.int32, без NumPy — список списков). Внутри карточки задания не повторяются.
+    При одинаковом seed выборка повторяется.
+    """
+    if per_card > population_size:
+        raise ValueError(f"В пуле всего {population_size} заданий, запрошено {per_card}")
+
+    if np is None:
+        rnd = seed if isinstance(seed, random.Random) else random.Random(seed)
+        return [rnd.sample(range(population_size), per_card) for _ in range(cards_count)]
+
+    rng = seed if isinstance(seed, np.random.Generator) else np.random.default_rng(seed)
+    out = np.empty((cards_count, per_card), dtype=np.int32)
+    rows = max(1, SAMPLE_CHUNK // max(population_size, 1))
+    for start in range(0, cards_count, rows):
+        keys = rng.random((min(rows, cards_count - start), population_size))
+        # Первые per_card по случайному ключу — равномерная выборка без повторов;
+        # argpartition не упорядочивает их, поэтому порядок перемешиваем отдельно
+        picked = np.argpartition(keys, per_card - 1, axis=1)[:, :per_card]
+        out[start:start + len(picked)] = rng.permuted(picked, axis=1)
+    return out
+
+
+def make_rng(seed=None):
+    """Генератор случайных чисел по seed; уже готовый генератор возвращается как есть"""
+    if np is not None:
+        return seed if isinstance(seed, np.random.Generator) else np.random.default_rng(seed)
+    return seed if isinstance(seed, random.Random) else random.Random(seed)
+
+
+def check_quotas(pool, quotas):
+    for file_num, count in quotas:
+        size = pool.ranges[file_num][1]
+        if count > size:
+            raise ValueError(f"В файле {file_num} всего {size} заданий, запрошено {count}")
+
+
+def sample_mix(pool, quotas, cards_count, seed=None):
+    """Индексы заданий всех карточек: квоты каждого файла без повторов внутри карточки"""
+    check_quotas(pool, quotas)
+    # Один генератор на все файлы: seed задаёт всю выборку целиком
+    rng = make_rng(seed)
+    blocks = []
+    for file_num, count in quotas:
+        size = pool.ranges[file_num][1]
+        blocks.append(sample_batch(size, count, cards_count, rng))
+    starts = [pool.ranges[file_num][0] for file_num, _ in quotas]
+
+    # Склеиваем квоты по карточкам в порядке, заданном в смеси
+    if np is not None:
+        return np.hstack([block + start for block, start in zip(blocks, starts)])
+    return [[i + start for row, start in zip(rows, starts) for i in row]
+            for rows in zip(*blocks)]
+
+
+def iter_sample_rows(pool, quotas, cards_count, seed=None):
+    """
+    Строки индексов по одной карточке. Выборка идёт блоками по SAMPLE_CHUNK
+    случайных чисел, поэтому память не растёт с числом карточек.
+    """
+    check_quotas(pool, quotas)
+    rng = make_rng(seed)
+    population = sum(pool.ranges[file_num][1] for file_num, _ in quotas)
+    rows = max(1, SAMPLE_CHUNK // max(population, 1))
+    for start in range(0, cards_count, rows):
+        yield from sample_mix(pool, quotas, min(rows, cards_count - start), rng)
+
+
+class SampleRows:
+    """
+    Строки индексов случайной выборки, которые можно обходить несколько раз.
+    Хранится копия состояния генератора, и каждый обход заново проходит
+    iter_sample_rows с этого состояния — строки всех обходов совпадают,
+    а в памяти по-прежнему только текущий блок.
+    """
+
+    def __init__(self, pool, quotas, cards_count, seed=None):
+        check_quotas(pool, quotas)
+        self.pool = pool
+        self.quotas = quotas
+        self.cards_count = cards_count
+        # Без seed генератор создаётся один раз, и его состояние повторяется в каждом обходе
+        self.rng = copy.deepcopy(make_rng(seed))
+
+    def __len__(self):
+        return self.cards_count
+
+    def __iter__(self):
+        return iter_sample_rows(self.pool, self.quotas, self.cards_count, copy.deepcopy(self.rng))
+
+
+def sample_balanced(pool, quotas, cards_count, max_overlap=None, seed=None):
+    """
+    Сбалансированная выборка: в карточку идут прежде всего реже всего
+    использованные задания, и никакие две карточки не делят больше
+    max_overlap заданий (по умолчанию — половина карточки).
+    Пересечения считаются инкрементально: у каждого задания есть битовая
+    маска карточек, где оно уже стоит, а у собираемой карточки — маска
+    карточек, пересечение с которыми уже предельное.
+    """
+    per_card = sum(count for _, count in quotas)
+    if max_overlap is None:
+        max_overlap = per_card // 2
+    rnd = random.Random(seed)
+    usage = [0] * len(pool.exprs)
+    task_cards = [0] * len(pool.exprs)    # задание -> маска карточек с ним
 
-    card_ids = get_next_card_numbers(file_num, cards_count)
     cards = []
+    for card in range(cards_count):
+        overlap = {}    # карточка -> сколько заданий уже общих с собираемой
+        full = (1 << card) - 1 if max_overlap == 0 else 0
+        row = []
+        for file_num, count in quotas:
+            start, size = pool.ranges[file_num]
+            if count > size:
+                raise ValueError(f"В файле {file_num} всего {size} заданий, запрошено {count}")
+            # Случайный порядок, затем устойчивая сортировка по использованию:
+            # среди одинаково использованных заданий выбор случаен
+            order = rnd.sample(range(start, start + size), size)
+            order.sort(key=usage.__getitem__)
+            taken = 0
+            for task in order:
+                if task_cards[task] & full:
+                    continue
+                row.append(task)
+                mask = task_cards[task]
+                while mask:
+                    low = mask & -mask
+                    other = low.bit_length() - 1
+                    overlap[other] = overlap.get(other, 0) + 1
+                    if overlap[other] >= max_overlap:
+                        full |= low
+                    mask ^= low
+                taken += 1
+                if taken == count:
+                    break
+            else:
+                raise ValueError(
+                    f"Карточка {card + 1}: не хватает заданий из файла {file_num}, чтобы пересечение "
+                    f"с другими карточками было не больше {max_overlap}; увеличьте --max-overlap"
+                )
+        bit = 1 << card
+        for task in row:
+            usage[task] += 1
+            task_cards[task] |= bit
+        cards.append(row)
+
+    if np is not None:
+        return np.array(cards, dtype=np.int32).reshape(cards_count, per_card)
+    return cards
+
+
+# =========================
+# Генерация карточек
+# =========================
+
+def generate_cards(file_num, tasks_per_card, cards_count, seed=None, balanced=False, max_overlap=None,
+                   use_cache=True):
+    pool = TaskPool.load([file_num], use_cache)
+    indices = sample_cards(pool, [(file_num, tasks_per_card)], cards_count, seed, balanced, max_overlap)
+    card_ids = reserve_card_numbers(file_num, cards_count)
+    return CardBatch(pool, card_ids, indices)
 
-    for card_id in card_ids:
-        selected = random.sample(task_numbers, tasks_per_card)
-        cards.append({
+
+# =========================
+# Смешанные карточки из нескольких файлов
+# =========================
+
+def parse_mix(spec):
+    """'4:2,16:3,17:1' -> [('4', 2), ('16', 3), ('17', 1)]"""
+    quotas = {}
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        file_num, sep, count = part.partition(':')
+        if not sep or not count.strip().isdigit() or int(count) < 1:
+            raise ValueError(f"Неверная квота '{part}', ожидается файл:число")
+        # Повтор файла в смеси складывается в одну квоту — задания не повторятся
+        file_num = file_num.strip()
+        quotas[file_num] = quotas.get(file_num, 0) + int(count)
+    if not quotas:
+        raise ValueError("Пустая смесь")
+    return list(quotas.items())
+
+
+class TaskPool:
+    """Задания нескольких файлов в общих списках; у каждого файла свой диапазон индексов"""
+
+    def __init__(self):
+        self.exprs = []
+        self.answers = []
+        self.ranges = {}    # файл -> (начало, размер)
+
+    @classmethod
+    def load(cls, file_nums, use_cache=True):
+        pool = cls()
+        for file_num in dict.fromkeys(file_nums):
+            tasks, answers = load_md_file(f'source/{file_num}.md', use_cache)
+            start = len(pool.exprs)
+            for n, expr in tasks.items():
+                pool.exprs.append(expr)
+                pool.answers.append(answers.get(n, '—'))
+            pool.ranges[file_num] = (start, len(tasks))
+        return pool
+
+    def card(self, card_id, indices):
+        return {
             'id': card_id,
             'tasks': [{
-                'expr': tasks[n],
-                'answer': answers.get(n, '—')
-            } for n in selected]
-        })
+                'expr': self.exprs[i],
+                'answer': self.answers[i]
+            } for i in indices]
+        }
 
-    return cards
+
+class CardBatch:
+    """
+    Карточки как строки индексов (карточка × задание) в пуле: таблица или
+    SampleRows. Словари карточек собираются по одной при обходе — так их
+    читают writers; партию можно обходить сколько угодно раз.
+    """
+
+    def __init__(self, pool, card_ids, indices):
+        self.pool = pool
+        self.card_ids = card_ids
+        self.indices = indices
+
+    def __len__(self):
+        return len(self.card_ids)
+
+    def rows(self):
+        """Пары (номер карточки, индексы заданий в пуле)"""
+        for card_id, row in zip(self.card_ids, self.indices):
+            yield card_id, row.tolist() if hasattr(row, 'tolist') else row
+
+    def __iter__(self):
+        for card_id, row in self.rows():
+            yield self.pool.card(card_id, row)
+
+
+def sample_cards(pool, quotas, cards_count, seed=None, balanced=False, max_overlap=None):
+    """
+    Строки индексов карточек. Случайная выборка отдаётся потоком (SampleRows); сбалансированная
+    считается целиком заранее — ей нужна история всех карточек, а ошибка
+    ограничения пересечений должна всплыть до резервирования номеров.
+    """
+    if balanced:
+        return sample_balanced(pool, quotas, cards_count, max_overlap, seed)
+    return SampleRows(pool, quotas, cards_count, seed)
+
+
+def generate_mixed_cards(quotas, cards_count, seed=None, balanced=False, max_overlap=None, use_cache=True):
+    pool = TaskPool.load((file_num for file_num, _ in quotas), use_cache)
+    indices = sample_cards(pool, quotas, cards_count, seed, balanced, max_overlap)
+    # Номера берутся из одного счётчика только после проверки квот
+    card_ids = reserve_card_numbers(MIX_COUNTER, cards_count)
+    return CardBatch(pool, card_ids, indices)
 
 
 # =========================
 # Сохранение карточек в отдельные файлы
 # =========================
 
-def write_cards_separate(cards):
-    """Сохраняет каждую карточку в отдельный файл"""
+def card_markdown(card):
+    lines = [f"# Карточка №{card['id']}\n\n"]
+    lines += [f"{i}. {t['expr']}\n" for i, t in enumerate(card['tasks'], 1)]
+    return ''.join(lines)
+
+
+def answers_markdown(card):
+    lines = [f"# Ответы к карточке №{card['id']}\n\n"]
+    lines += [f"{i}. {t['answer']}\n" for i, t in enumerate(card['tasks'], 1)]
+    return ''.join(lines)
+
+
+# Запись устроена как конвейер генераторов: каждая ступень пишет свой файл
+# и передаёт карточку дальше, так что выборка → сборка → карточки → ответы
+# проходят за один обход по одной карточке в памяти.
+
+def stream_cards_separate(cards):
+    """Пишет каждую карточку в отдельный файл и отдаёт её дальше"""
     os.makedirs(CARDS_DIR, exist_ok=True)
 
     for card in cards:
         filename = os.path.join(CARDS_DIR, f"{card['id']}.md")
+        with open(filename, 'w', encoding='utf-8') as f:
+            f.write(card_markdown(card))
+        yield card
 
-        md = f"# Карточка №{card['id']}\n\n"
-        for i, t in enumerate(card['tasks'], 1):
-            md += f"{i}. {t['expr']}\n"
 
+def stream_answers_separate(cards):
+    """Пишет ответы каждой карточки в отдельный файл и отдаёт карточку дальше"""
+    os.makedirs(ANSWERS_DIR, exist_ok=True)
+
+    for card in cards:
+        filename = os.path.join(ANSWERS_DIR, f"{card['id']}.md")
         with open(filename, 'w', encoding='utf-8') as f:
-            f.write(md)
+            f.write(answers_markdown(card))
+        yield card
+
+
+def drain(stream):
+    """Прогоняет конвейер до конца, возвращает число карточек"""
+    count = 0
+    for count, _ in enumerate(stream, 1):
+        pass
+    return count
+
+
+def write_cards_separate(cards):
+    """Сохраняет каждую карточку в отдельный файл"""
+    return drain(stream_cards_separate(cards))
 
 
 def write_answers_separate(cards):
     """Сохраняет ответы для каждой карточки в отдельный файл"""
-    os.makedirs(ANSWERS_DIR, exist_ok=True)
+    return drain(stream_answers_separate(cards))
 
-    for card in cards:
-        filename = os.path.join(ANSWERS_DIR, f"{card['id']}.md")
 
-        md = f"# Ответы к карточке №{card['id']}\n\n"
-        for i, t in enumerate(card['tasks'], 1):
-            md += f"{i}. {t['answer']}\n"
+def write_separate(cards):
+    """Карточки и ответы отдельными файлами за один проход"""
+    return drain(stream_answers_separate(stream_cards_separate(cards)))
 
-        with open(filename, 'w', encoding='utf-8') as f:
-            f.write(md)
+
+# =========================
+# Сохранение карточек одним пакетом
+# =========================
+# Вместо двух файлов на карточку все карточки и ответы пишутся за один проход
+# в один пакет с буферизованной записью:
+#   md    — два файла: все карточки и все ответы (.cards.md / .answers.md)
+#   jsonl — одна строка на карточку: {"id", "tasks": [{"expr", "answer"}]}
+#   zip   — cards/ID.md, answers/ID.md и manifest.json в одном архиве
+
+OUTPUT_MODES = ('files', 'md', 'jsonl', 'zip', 'pocketbase')
+WRITE_BUFFER = 1 << 20
+
+
+def bundle_path(card_ids, mode):
+    """Путь пакета по умолчанию: bundles/<первый номер>_<последний номер>"""
+    base = os.path.join(BUNDLE_DIR, f'{card_ids[0]}_{card_ids[-1]}')
+    return base if mode == 'md' else f'{base}.{mode}'
+
+
+def write_bundle_md(cards, base):
+    if base.endswith('.md'):
+        base = base[:-len('.md')]
+    cards_path = f'{base}.cards.md'
+    answers_path = f'{base}.answers.md'
+    with open(cards_path, 'w', encoding='utf-8', buffering=WRITE_BUFFER) as cards_out, \
+            open(answers_path, 'w', encoding='utf-8', buffering=WRITE_BUFFER) as answers_out:
+        for n, card in enumerate(cards):
+            if n:
+                cards_out.write('\n')
+                answers_out.write('\n')
+            cards_out.write(card_markdown(card))
+            answers_out.write(answers_markdown(card))
+    return [cards_path, answers_path]
+
+
+def write_bundle_jsonl(cards, path):
+    with open(path, 'w', encoding='utf-8', buffering=WRITE_BUFFER) as out:
+        for card in cards:
+            out.write(json.dumps(card, ensure_ascii=False))
+            out.write('\n')
+    return [path]
+
+
+def write_bundle_zip(cards, path):
+    card_ids = []
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for card in cards:
+            card_ids.append(card['id'])
+            zf.writestr(f"{CARDS_DIR}/{card['id']}.md", card_markdown(card))
+            zf.writestr(f"{ANSWERS_DIR}/{card['id']}.md", answers_markdown(card))
+        manifest = {'count': len(card_ids), 'cards': card_ids}
+        zf.writestr('manifest.json', json.dumps(manifest, ensure_ascii=False, indent=1))
+    return [path]
+
+
+BUNDLE_WRITERS = {
+    'md': write_bundle_md,
+    'jsonl': write_bundle_jsonl,
+    'zip': write_bundle_zip
+}
+
+
+def write_bundle(cards, mode, path):
+    """Пишет карточки и ответы пакетом mode в path, возвращает созданные файлы"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    return BUNDLE_WRITERS[mode](cards, path)
 
 
 # =========================
@@ -143,19 +632,100 @@ def write_answers_separate(cards):
 # =========================
 
 if __name__ == '__main__':
-    parser = argparse.ArgumentParser(description='Генератор карточек (md)')
-    parser.add_argument('file')
-    parser.add_argument('tasks', type=int)
+    parser = argparse.ArgumentParser(
+        description='Генератор карточек (md)',
+        epilog='Примеры: python3 test_generator.py 16 5 --cards 30 | '
+               'python3 test_generator.py --mix 4:2,16:3,17:1 --cards 30'
+    )
+    parser.add_argument('file', nargs='?')
+    parser.add_argument('tasks', type=int, nargs='?')
     parser.add_argument('--cards', type=int, default=20)
+    parser.add_argument('--seed', type=int, help='зерно случайной выборки (одинаковое зерно — одинаковые карточки)')
+    parser.add_argument('--balanced', action='store_true',
+                        help='равномерно распределить задания по карточкам и ограничить их пересечения')
+    parser.add_argument('--max-overlap', type=int,
+                        help='сколько заданий могут делить две карточки в режиме --balanced (по умолчанию половина карточки)')
+    parser.add_argument('--output', choices=OUTPUT_MODES, default='files',
+                        help='files — по файлу на карточку и ответы (по умолчанию); '
+                             'md, jsonl, zip — всё одним пакетом; pocketbase — в коллекцию cards')
+    parser.add_argument('--bundle', help=f'путь пакета (по умолчанию {BUNDLE_DIR}/<первый>_<последний номер>)')
+    pb_group = parser.add_argument_group('выгрузка в PocketBase (--output pocketbase)')
+    pb_group.add_argument('--title', default='Карточка', help='название карточек, к нему добавляется номер')
+    pb_group.add_argument('--card-format', default='А6', help='формат печати: А6, А5 или А4')
+    pb_group.add_argument('--show-answers', action='store_true', help='показывать ответы на карточках')
+    pb_group.add_argument('--note', default='', help='примечание к карточкам')
+    pb_group.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                          help=f'карточек в одном запросе /api/batch (по умолчанию {DEFAULT_BATCH_SIZE})')
+    pb_group.add_argument('--mirror', action='store_true',
+                          help='искать задачи в локальном зеркале PocketBase (pb_mirror.py), а не на сервере')
+    pb_group.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY,
+                          help='сколько пакетов отправлять параллельно')
+    parser.add_argument('--no-cache', action='store_true',
+                        help=f'разбирать source/*.md заново, не используя кэш {PARSE_CACHE_DIR}/')
+    parser.add_argument('--mix', help='смешанные карточки: файл:число заданий через запятую, например 4:2,16:3,17:1')
 
     args = parser.parse_args()
+    if args.cards < 1:
+        parser.error('--cards должно быть не меньше 1')
+    if args.max_overlap is not None and args.max_overlap < 0:
+        parser.error('--max-overlap не может быть отрицательным')
+
+    if args.output == 'pocketbase':
+        # Клиент PocketBase нужен только для выгрузки — остальные режимы работают без requests
+        import pb_cards
+        try:
+            card_format = pb_cards.normalize_card_format(args.card_format)
+        except ValueError as e:
+            parser.error(str(e))
+
+    if args.mix:
+        if args.file or args.tasks:
+            parser.error('с --mix не указываются file и tasks')
+        try:
+            quotas = parse_mix(args.mix)
+        except ValueError as e:
+            parser.error(str(e))
+        try:
+            cards = generate_mixed_cards(quotas, args.cards, args.seed, args.balanced, args.max_overlap,
+                                         not args.no_cache)
+        except (ValueError, FileNotFoundError) as e:
+            parser.error(str(e))
+    else:
+        if not args.file or not args.tasks:
+            parser.error('укажите file и tasks или --mix')
+        try:
+            cards = generate_cards(args.file, args.tasks, args.cards, args.seed, args.balanced, args.max_overlap,
+                                   not args.no_cache)
+        except (ValueError, FileNotFoundError) as e:
+            parser.error(str(e))
+
+    if args.output == 'files':
+        write_separate(cards)
+
+        print(f"✓ Сгенерировано карточек: {len(cards)}")
+        print(f"Карточки сохранены в: {CARDS_DIR}/")
+        print(f"Ответы сохранены в: {ANSWERS_DIR}/")
+    elif args.output == 'pocketbase':
+        client = pb_cards.connect(args.concurrency)
+        print("✅ Авторизация прошла успешно")
+        mirror = None
+        if args.mirror:
+            import pb_mirror
+            mirror = pb_mirror.open_synced(client)
+        created, failed, skipped = pb_cards.export_cards(
+            client, cards, title=args.title, card_format=card_format, show_answers=args.show_answers,
+            note=args.note, batch_size=args.batch_size, concurrency=args.concurrency, mirror=mirror
+        )
+
+        print(f"✓ Сохранено карточек в PocketBase: {created} из {len(cards)}")
+        if failed:
+            print(f"❌ С ошибкой: {failed}")
+        if skipped:
+            print(f"⚠️ Пропущено (задания не найдены в базе): {len(skipped)}")
+    else:
+        paths = write_bundle(cards, args.output, args.bundle or bundle_path(cards.card_ids, args.output))
 
-    cards = generate_cards(args.file, args.tasks, args.cards)
-
-    write_cards_separate(cards)
-    write_answers_separate(cards)
-
-    print(f"✓ Сгенерировано карточек: {len(cards)}")
-    print(f"Карточки сохранены в: {CARDS_DIR}/")
-    print(f"Ответы сохранены в: {ANSWERS_DIR}/")
+        print(f"✓ Сгенерировано карточек: {len(cards)}")
+        for path in paths:
+            print(f"Пакет сохранён в: {path}")
 